@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency of the hot API endpoints.
+
+Seeds a synthetic dataset with seed_data.seed_synthetic, runs the FastAPI app in-process
+through httpx's ASGI transport (startup hooks are called by hand, as the transport has no
+lifespan support) and drives each scenario with a fixed number of concurrent clients.
+Results are printed as JSON so runs can be diffed commit to commit.
+
+    python benchmarks/load_test.py --customers 1000 --requests 500 --concurrency 20
+    python benchmarks/load_test.py --mongo-url mongodb://localhost:27017 --customers 100000
+
+Without --mongo-url the app runs on mongomock-motor, which measures the Python side (routing,
+validation, serialization) but not real query plans or index use. With --mongo-url the
+--db-name database is dropped and reseeded.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'loadtest')
+
+import httpx  # noqa: E402
+import server  # noqa: E402
+from seed_data import SYNTHETIC_PASSWORD, seed_synthetic  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def use_database(args):
+    """Point the server module at the benchmark database."""
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+        client = AsyncIOMotorClient(args.mongo_url, event_listeners=[server.CommandProfiler()])
+        backend = "mongod"
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+        backend = "mongomock"
+    server.client = client
+    server.db = client[args.db_name]
+    if args.mongo_url:
+        server.uploads_bucket = AsyncIOMotorGridFSBucket(server.db, bucket_name="uploads")
+    return backend
+
+
+class Workload:
+    """Request builders for each scenario; `rng` makes the request mix reproducible."""
+
+    def __init__(self, http, token, customer_ids, emails, rng, bulk_rows):
+        self.http = http
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.customer_ids = customer_ids
+        self.emails = emails
+        self.rng = rng
+        self.bulk_rows = bulk_rows
+        self.uploads = 0
+
+    async def login(self):
+        return await self.http.post("/api/auth/login", json={
+            "email": self.rng.choice(self.emails), "password": SYNTHETIC_PASSWORD
+        })
+
+    async def customer_list(self):
+        params = {"limit": 50}
+        if self.rng.random() < 0.5:
+            params['region'] = self.rng.choice(["South India", "West India", "North India"])
+        return await self.http.get("/api/customers", params=params, headers=self.headers)
+
+    async def dashboard_stats(self):
+        return await self.http.get("/api/dashboard/stats", headers=self.headers)
+
+    async def customer_detail(self):
+        return await self.http.get(f"/api/customers/{self.rng.choice(self.customer_ids)}", headers=self.headers)
+
+    async def customer_overview(self):
+        return await self.http.get(f"/api/customers/{self.rng.choice(self.customer_ids)}/overview", headers=self.headers)
+
+    async def bulk_upload(self):
+        self.uploads += 1
+        rows = "".join(
+            f"Load Test {self.uploads:05d}-{n:04d},South India,{self.rng.randint(100, 5000) * 1000}\n"
+            for n in range(self.bulk_rows)
+        )
+        return await self.http.post(
+            "/api/customers/bulk-upload",
+            files={"file": ("customers.csv", "company_name,region,arr\n" + rows, "text/csv")},
+            headers=self.headers
+        )
+
+
+# (scenario, fraction of --requests); bcrypt-bound login and write-heavy bulk upload run fewer
+SCENARIOS = [
+    ("login", 0.1),
+    ("customer_list", 1.0),
+    ("dashboard_stats", 1.0),
+    ("customer_detail", 1.0),
+    ("customer_overview", 1.0),
+    ("bulk_upload", 0.1),
+]
+
+
+async def run_scenario(request, total, concurrency, warmup):
+    for _ in range(warmup):
+        await request()
+
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(total))
+
+    async def client():
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await request()
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": sum(count for code, count in statuses.items() if not code.startswith("2")),
+        "status_counts": dict(statuses),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", help="run against this mongod instead of mongomock-motor")
+    parser.add_argument("--db-name", default="loadtest", help="database to drop and seed (default: loadtest)")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--activities-per-customer", type=int, default=5)
+    parser.add_argument("--risks-per-customer", type=int, default=1)
+    parser.add_argument("--tasks-per-customer", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=200, help="requests per read scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    parser.add_argument("--bulk-rows", type=int, default=100, help="CSV rows per bulk upload")
+    parser.add_argument("--scenarios", default=",".join(name for name, _ in SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    backend = use_database(args)
+    if args.mongo_url:
+        await server.client.drop_database(args.db_name)
+    else:
+        # mongomock can't create time-series collections; an existing plain one is left alone
+        await server.db.create_collection("customer_metrics_history")
+
+    seeding_started = time.perf_counter()
+    dataset = await seed_synthetic(
+        server.db,
+        customers=args.customers,
+        activities_per_customer=args.activities_per_customer,
+        risks_per_customer=args.risks_per_customer,
+        tasks_per_customer=args.tasks_per_customer,
+        seed=args.seed
+    )
+    seed_seconds = time.perf_counter() - seeding_started
+
+    for handler in server.app.router.on_startup:
+        await handler()
+
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as http:
+            login = await http.post("/api/auth/login", json={"email": "admin@convin.ai", "password": SYNTHETIC_PASSWORD})
+            login.raise_for_status()
+            users = await server.db.users.find({}, {"_id": 0, "email": 1}).to_list(None)
+            workload = Workload(
+                http,
+                login.json()['access_token'],
+                [f"customer_{idx+1}" for idx in range(args.customers)],
+                [user['email'] for user in users],
+                random.Random(args.seed),
+                args.bulk_rows
+            )
+            selected = set(args.scenarios.split(","))
+            for name, fraction in SCENARIOS:
+                if name not in selected:
+                    continue
+                total = max(1, int(args.requests * fraction))
+                results[name] = await run_scenario(getattr(workload, name), total, args.concurrency, args.warmup)
+                print(f"{name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+    finally:
+        for handler in server.app.router.on_shutdown:
+            await handler()
+
+    report = {
+        "commit": git_commit(),
+        "backend": backend,
+        "dataset": dataset,
+        "seed_seconds": round(seed_seconds, 2),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "bulk_rows": args.bulk_rows,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Event-loop latency while logins are in flight.
+
+Runs a burst of concurrent bcrypt verifications, first inline on the event loop (how
+/auth/login used to call verify_password) and then through the bounded password executor,
+while a probe coroutine measures how late the loop wakes it up. The probe stands in for
+every other request sharing the worker.
+
+    python benchmarks/password_hashing.py --logins 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+import server  # noqa: E402
+
+PROBE_INTERVAL = 0.005
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        scheduled = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - scheduled - PROBE_INTERVAL)
+
+
+async def inline_login(hashed):
+    server.verify_password("password123", hashed)
+
+
+async def pooled_login(hashed):
+    await server.verify_password_async("password123", hashed)
+
+
+async def run(mode, login, logins, hashed):
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(login(hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return {
+        "mode": mode,
+        "logins": logins,
+        "elapsed_seconds": round(elapsed, 3),
+        "loop_lag_p50_ms": round(percentile(lags, 50) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(lags, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0) * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20, help="concurrent logins per run")
+    args = parser.parse_args()
+
+    hashed = server.hash_password("password123")
+    # Stay under the 429 cap so every login completes
+    logins = min(args.logins, server.PASSWORD_HASH_MAX_PENDING)
+    results = [
+        await run("inline", inline_login, logins, hashed),
+        await run("executor", pooled_login, logins, hashed),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
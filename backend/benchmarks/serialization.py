@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+CPU cost of serializing list endpoint responses.
+
+For each model, serializes the same synthetic documents two ways and checks the JSON matches:
+
+    legacy   parse ISO timestamps row by row, then FastAPI's response_model pass
+             (serialize_response) and JSONResponse encoding, as the list routes used to
+    adapter  server.list_response: one prebuilt TypeAdapter validate_python + dump_json
+
+    python benchmarks/serialization.py --rows 1000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import server  # noqa: E402
+import seed_data  # noqa: E402
+
+TIMESTAMP_FIELDS = {
+    server.Customer: ("created_at", "updated_at"),
+    server.Activity: ("activity_date", "created_at"),
+    server.Risk: ("created_at", "updated_at"),
+    server.Task: ("created_at", "updated_at"),
+}
+
+
+def documents(rows, seed):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    csms = [{"id": "user_1", "name": "CSM 1", "region": "South India"}]
+    customers = [seed_data.synthetic_customer(idx, csms, rng, now) for idx in range(rows)]
+    customer = customers[0]
+    return {
+        server.Customer: customers,
+        server.Activity: list(seed_data.synthetic_activities(customer, rows, rng, now)),
+        server.Risk: list(seed_data.synthetic_risks(customer, rows, rng, now)),
+        server.Task: list(seed_data.synthetic_tasks(customer, rows, rng, now)),
+    }
+
+
+async def legacy(model, rows, field):
+    for row in rows:
+        for name in TIMESTAMP_FIELDS[model]:
+            if isinstance(row[name], str):
+                row[name] = datetime.fromisoformat(row[name])
+    content = await serialize_response(field=field, response_content=rows)
+    return JSONResponse(content).body
+
+
+async def adapter(model, rows, field):
+    return server.list_response(model, rows).body
+
+
+async def measure(serialize, model, docs, repeat):
+    field = create_response_field(name="response", type_=List[model], mode="serialization")
+    timings = []
+    for _ in range(repeat):
+        rows = [dict(doc) for doc in docs]  # Fresh copies; the legacy path mutates rows
+        started = time.perf_counter()
+        body = await serialize(model, rows, field)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), body
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="documents per list response")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = []
+    for model, docs in documents(args.rows, args.seed).items():
+        legacy_seconds, legacy_body = await measure(legacy, model, docs, args.repeat)
+        adapter_seconds, adapter_body = await measure(adapter, model, docs, args.repeat)
+        results.append({
+            "model": model.__name__,
+            "rows": len(docs),
+            "legacy_ms": round(legacy_seconds * 1000, 2),
+            "adapter_ms": round(adapter_seconds * 1000, 2),
+            "speedup": round(legacy_seconds / adapter_seconds, 2),
+            "identical_json": json.loads(legacy_body) == json.loads(adapter_body),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+Customer health scoring model.
+
+Kept free of the API module so scripts such as seed_data.py can score customers
+without building the FastAPI app or connecting to MongoDB.
+"""
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class HealthModelConfig(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    version: int
+    description: Optional[str] = None
+    base_score: float = 50.0
+    usage_tiers: List[Tuple[float, float]] = [(0.7, 15), (0.5, 10), (0.3, 5)]  # (min usage rate, points)
+    calls_tiers: List[Tuple[float, float]] = [(1000, 10), (500, 5)]  # (calls processed above, points)
+    engagement_tiers: List[Tuple[float, float]] = [(7, 15), (14, 10), (30, 5)]  # (days since activity below, points)
+    onboarding_points: Dict[str, float] = {"Completed": 10, "In Progress": 5}
+    healthy_threshold: float = 80
+    at_risk_threshold: float = 50
+    active: bool = False
+    created_by_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+DEFAULT_HEALTH_MODEL = HealthModelConfig(version=1, description="Default scoring model", active=True)
+
+
+def numeric(value: Any) -> float:
+    """Missing or non-numeric inputs count as 0, as pd.to_numeric(errors='coerce').fillna(0) does in score_frame."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(number) else number
+
+
+class CompiledHealthModel:
+    """Pre-sorted, immutable form of a HealthModelConfig used on the scoring hot path."""
+
+    def __init__(self, config: HealthModelConfig):
+        self.version = config.version
+        self.base_score = config.base_score
+        # Highest threshold first for "at least"/"above" tiers, lowest first for "below" tiers
+        self.usage_tiers = tuple(sorted(config.usage_tiers, reverse=True))
+        self.calls_tiers = tuple(sorted(config.calls_tiers, reverse=True))
+        self.engagement_tiers = tuple(sorted(config.engagement_tiers))
+        self.onboarding_points = dict(config.onboarding_points)
+        self.healthy_threshold = config.healthy_threshold
+        self.at_risk_threshold = config.at_risk_threshold
+
+    def score(self, customer: Dict, now: Optional[datetime] = None) -> float:
+        score = self.base_score
+
+        # Usage
+        active, licensed = numeric(customer.get('active_users')), numeric(customer.get('total_licensed_users'))
+        if active > 0 and licensed > 0:
+            usage_rate = active / licensed
+            score += next((points for threshold, points in self.usage_tiers if usage_rate >= threshold), 0)
+
+        calls = numeric(customer.get('calls_processed'))
+        score += next((points for threshold, points in self.calls_tiers if calls > threshold), 0)
+
+        # Engagement
+        last_activity = customer.get('last_activity_date')
+        if isinstance(last_activity, str) and last_activity:
+            try:
+                days_since = ((now or datetime.now(timezone.utc)) - datetime.fromisoformat(last_activity)).days
+                score += next((points for threshold, points in self.engagement_tiers if days_since < threshold), 0)
+            except (TypeError, ValueError):
+                pass
+
+        # Onboarding
+        score += self.onboarding_points.get(customer.get('onboarding_status'), 0)
+
+        return min(100, max(0, score))
+
+    def score_frame(self, frame: pd.DataFrame, now: datetime) -> np.ndarray:
+        """Vectorized equivalent of score() over a frame of HEALTH_INPUT_FIELDS."""
+        active = pd.to_numeric(frame['active_users'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        licensed = pd.to_numeric(frame['total_licensed_users'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        calls = pd.to_numeric(frame['calls_processed'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        score = np.full(len(frame), float(self.base_score))
+
+        # Usage
+        has_usage = (active > 0) & (licensed > 0)
+        usage_rate = np.divide(active, licensed, out=np.zeros_like(active), where=has_usage)
+        score += np.select([has_usage & (usage_rate >= threshold) for threshold, _ in self.usage_tiers],
+                           [points for _, points in self.usage_tiers], 0)
+        score += np.select([calls > threshold for threshold, _ in self.calls_tiers],
+                           [points for _, points in self.calls_tiers], 0)
+
+        # Engagement: only ISO strings count, and timezone-naive ones fail the aware
+        # subtraction in score() and earn nothing, so they are masked out here too
+        raw_activity = frame['last_activity_date']
+        last_activity = raw_activity.where(raw_activity.map(lambda value: isinstance(value, str))).astype("string")
+        is_aware = last_activity.str.contains(r'(?:Z|[+-]\d{2}:?\d{2})$', regex=True).fillna(False).to_numpy(dtype=bool)
+        parsed = pd.to_datetime(last_activity.where(is_aware), utc=True, errors='coerce', format='ISO8601')
+        days_since = (pd.Timestamp(now) - parsed).dt.days.to_numpy(dtype=float, na_value=np.nan)
+        score += np.select([days_since < threshold for threshold, _ in self.engagement_tiers],
+                           [points for _, points in self.engagement_tiers], 0)
+
+        # Onboarding
+        onboarding = frame['onboarding_status'].to_numpy()
+        score += np.select([onboarding == status for status in self.onboarding_points],
+                           list(self.onboarding_points.values()), 0)
+
+        return np.clip(score, 0, 100)
+
+    def status(self, score: float) -> str:
+        if score >= self.healthy_threshold:
+            return "Healthy"
+        elif score >= self.at_risk_threshold:
+            return "At Risk"
+        else:
+            return "Critical"
+
+    def status_array(self, scores: np.ndarray) -> np.ndarray:
+        return np.select([scores >= self.healthy_threshold, scores >= self.at_risk_threshold],
+                         ["Healthy", "At Risk"], "Critical")
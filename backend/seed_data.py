@@ -1,4 +1,7 @@
+import argparse
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from datetime import datetime, timezone, timedelta
@@ -6,6 +9,7 @@ import random
 import bcrypt
 from dotenv import load_dotenv
 from pathlib import Path
+from health_model import DEFAULT_HEALTH_MODEL, CompiledHealthModel
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -15,6 +19,8 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+HEALTH_MODEL = CompiledHealthModel(DEFAULT_HEALTH_MODEL)
+
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
@@ -97,6 +103,12 @@ async def clear_database():
     await db.activities.delete_many({})
     await db.risks.delete_many({})
     await db.opportunities.delete_many({})
+    await db.tasks.delete_many({})
+    # Readers rebuild a missing rollup from the reseeded collections
+    await db.dashboard_rollups.delete_many({})
+    # Old series would otherwise attach to the reseeded customer_N ids
+    await db.customer_metrics_history.delete_many({})
+    await db.customer_metrics_rollups.delete_many({})
     print("✓ Database cleared")
 
 async def seed_users():
@@ -153,30 +165,7 @@ async def seed_customers(users):
         total_users = int(active_users * random.uniform(1.1, 1.5))
         calls_processed = random.randint(10000, 500000)
         
-        # Calculate health score
-        usage_rate = active_users / total_users
-        health_score = 50.0
-        if usage_rate >= 0.7:
-            health_score += 15
-        elif usage_rate >= 0.5:
-            health_score += 10
-        
-        if calls_processed > 100000:
-            health_score += 15
-        elif calls_processed > 50000:
-            health_score += 10
-        
-        # Add activity bonus
-        health_score += random.randint(5, 15)
-        health_score = min(100, health_score)
-        
-        # Determine status
-        if health_score >= 80:
-            health_status = "Healthy"
-        elif health_score >= 50:
-            health_status = "At Risk"
-        else:
-            health_status = "Critical"
+        last_activity_date = (datetime.now(timezone.utc) - timedelta(days=random.randint(0, 30))).isoformat()
         
         # Random dates
         contract_start = datetime.now(timezone.utc) - timedelta(days=random.randint(180, 730))
@@ -194,6 +183,16 @@ async def seed_customers(users):
         # Select 2-4 products
         products = random.sample(PRODUCTS, random.randint(2, 4))
         
+        # Score with the same model the API uses
+        health_score = HEALTH_MODEL.score({
+            "active_users": active_users,
+            "total_licensed_users": total_users,
+            "calls_processed": calls_processed,
+            "last_activity_date": last_activity_date,
+            "onboarding_status": onboarding_status
+        })
+        health_status = HEALTH_MODEL.status(health_score)
+        
         customer = {
             "id": f"customer_{idx+1}",
             "company_name": customer_data["name"],
@@ -210,6 +209,7 @@ async def seed_customers(users):
             "onboarding_status": onboarding_status,
             "health_score": health_score,
             "health_status": health_status,
+            "health_model_version": HEALTH_MODEL.version,
             "risk_level": "Low" if health_score > 75 else "Medium" if health_score > 60 else "High",
             "primary_objective": random.choice(["QA Automation", "Training", "Audit", "Compliance", "Performance Management"]),
             "calls_processed": calls_processed,
@@ -221,7 +221,7 @@ async def seed_customers(users):
             "am_owner_name": None,
             "tags": [],
             "stakeholders": [],
-            "last_activity_date": (datetime.now(timezone.utc) - timedelta(days=random.randint(0, 30))).isoformat(),
+            "last_activity_date": last_activity_date,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat()
         }
@@ -395,12 +395,277 @@ async def seed_opportunities(customers):
         await db.opportunities.insert_many(opportunities)
     print(f"✓ Created {len(opportunities)} opportunities")
 
+# Scaled synthetic dataset
+# The lists above are the 30-account demo. These generators build the same document shapes at
+# any scale for load testing; benchmarks/load_test.py seeds through seed_synthetic().
+# Each customer draws from its own RNG seeded with (seed, index), and timestamps are relative
+# to one `now`, so the dataset doesn't depend on how the range is split across workers.
+REGIONS = ["South India", "West India", "North India"]
+INDUSTRIES = sorted({customer["industry"] for customer in CUSTOMERS})
+TASK_TYPES = ["Follow-up Call", "Follow-up Email", "Schedule Meeting", "Review Account", "Renewal Preparation"]
+TASK_STATUSES = ["Not Started", "In Progress", "Waiting on Customer", "Completed"]
+SYNTHETIC_PASSWORD = "password123"
+
+def synthetic_users(csm_count, now):
+    """Admin plus `csm_count` CSMs spread across regions; every account uses SYNTHETIC_PASSWORD."""
+    # One bcrypt hash shared by all synthetic accounts; hashing each would take ~0.2 s apiece
+    password_hash = hash_password(SYNTHETIC_PASSWORD)
+    now = now.isoformat()
+    users = [{
+        "id": "user_admin",
+        "email": "admin@convin.ai",
+        "password": password_hash,
+        "name": "Admin User",
+        "role": "ADMIN",
+        "created_at": now
+    }]
+    for idx in range(csm_count):
+        users.append({
+            "id": f"user_{idx+1}",
+            "email": f"csm{idx+1}@convin.ai",
+            "password": password_hash,
+            "name": f"CSM {idx+1}",
+            "role": "CSM",
+            "region": REGIONS[idx % len(REGIONS)],
+            "created_at": now
+        })
+    return users
+
+def synthetic_customer(idx, csms, rng, now):
+    csm = csms[idx % len(csms)]
+    active_users = rng.randint(50, 500)
+    total_users = int(active_users * rng.uniform(1.1, 1.5))
+    calls_processed = rng.randint(10000, 500000)
+    last_activity_date = (now - timedelta(days=rng.randint(0, 30))).isoformat()
+    contract_start = now - timedelta(days=rng.randint(180, 730))
+    go_live = contract_start + timedelta(days=rng.randint(30, 90))
+    onboarding_status = "In Progress" if (now - go_live).days < 30 else "Completed"
+    
+    health_score = HEALTH_MODEL.score({
+        "active_users": active_users,
+        "total_licensed_users": total_users,
+        "calls_processed": calls_processed,
+        "last_activity_date": last_activity_date,
+        "onboarding_status": onboarding_status
+    })
+    
+    return {
+        "id": f"customer_{idx+1}",
+        "company_name": f"Synthetic Account {idx+1:06d}",
+        "website": f"https://account{idx+1}.example.com",
+        "industry": rng.choice(INDUSTRIES),
+        "region": csm["region"],
+        "plan_type": "License",
+        "arr": rng.randint(100, 6000) * 1000,
+        "contract_start_date": contract_start.date().isoformat(),
+        "contract_end_date": (contract_start + timedelta(days=365)).date().isoformat(),
+        "renewal_date": (contract_start + timedelta(days=365)).date().isoformat(),
+        "go_live_date": go_live.date().isoformat(),
+        "products_purchased": rng.sample(PRODUCTS, rng.randint(2, 4)),
+        "onboarding_status": onboarding_status,
+        "account_status": "Live",
+        "health_score": health_score,
+        "health_status": HEALTH_MODEL.status(health_score),
+        "health_model_version": HEALTH_MODEL.version,
+        "calls_processed": calls_processed,
+        "active_users": active_users,
+        "total_licensed_users": total_users,
+        "csm_owner_id": csm["id"],
+        "csm_owner_name": csm["name"],
+        "am_owner_id": None,
+        "am_owner_name": None,
+        "tags": [],
+        "stakeholders": [],
+        "last_activity_date": last_activity_date,
+        "created_at": contract_start.isoformat(),
+        "updated_at": now.isoformat()
+    }
+
+def synthetic_activities(customer, count, rng, now):
+    for n in range(count):
+        activity_date = now - timedelta(days=rng.randint(0, 365))
+        activity_type = rng.choice(ACTIVITY_TYPES)
+        yield {
+            "id": f"{customer['id']}_activity_{n+1}",
+            "customer_id": customer["id"],
+            "customer_name": customer["company_name"],
+            "activity_type": activity_type,
+            "activity_date": activity_date.isoformat(),
+            "title": f"{activity_type} with {customer['company_name']}",
+            "summary": "Reviewed product adoption and usage trends.",
+            "sentiment": rng.choices(["Positive", "Neutral", "Negative"], weights=[0.6, 0.3, 0.1])[0],
+            "follow_up_required": rng.random() < 0.3,
+            "csm_id": customer["csm_owner_id"],
+            "csm_name": customer["csm_owner_name"],
+            "created_at": activity_date.isoformat()
+        }
+
+def synthetic_risks(customer, count, rng, now):
+    for n in range(count):
+        category = rng.choice(list(RISK_CATEGORIES.keys()))
+        identified_date = now - timedelta(days=rng.randint(5, 120))
+        yield {
+            "id": f"{customer['id']}_risk_{n+1}",
+            "customer_id": customer["id"],
+            "customer_name": customer["company_name"],
+            "category": category,
+            "subcategory": rng.choice(RISK_CATEGORIES[category]),
+            "severity": rng.choice(["Low", "Medium", "High", "Critical"]),
+            "status": rng.choice(["Open", "In Progress", "Monitoring", "Resolved"]),
+            "title": f"{category} at {customer['company_name']}",
+            "description": "Risk identified during regular health check.",
+            "revenue_impact": rng.randint(50000, 500000),
+            "churn_probability": rng.randint(20, 80),
+            "identified_date": identified_date.date().isoformat(),
+            "assigned_to_id": customer["csm_owner_id"],
+            "assigned_to_name": customer["csm_owner_name"],
+            "created_at": identified_date.isoformat(),
+            "updated_at": now.isoformat()
+        }
+
+def synthetic_tasks(customer, count, rng, now):
+    for n in range(count):
+        created = now - timedelta(days=rng.randint(0, 60))
+        task_type = rng.choice(TASK_TYPES)
+        yield {
+            "id": f"{customer['id']}_task_{n+1}",
+            "customer_id": customer["id"],
+            "customer_name": customer["company_name"],
+            "task_type": task_type,
+            "title": f"{task_type} for {customer['company_name']}",
+            "priority": rng.choice(["Critical", "High", "Medium", "Low"]),
+            "status": rng.choice(TASK_STATUSES),
+            "assigned_to_id": customer["csm_owner_id"],
+            "assigned_to_name": customer["csm_owner_name"],
+            "due_date": (created + timedelta(days=rng.randint(-10, 30))).date().isoformat(),
+            "created_by_id": customer["csm_owner_id"],
+            "created_by_name": customer["csm_owner_name"],
+            "created_at": created.isoformat(),
+            "updated_at": now.isoformat()
+        }
+
+async def seed_customer_range(target_db, csms, start, end, activities_per_customer, risks_per_customer,
+                              tasks_per_customer, seed, now, chunk_size):
+    """Generate customers [start, end) and their children, writing each collection in insert_many chunks."""
+    counts = {"customers": 0, "activities": 0, "risks": 0, "tasks": 0}
+    pending = {collection: [] for collection in counts}
+    
+    async def flush(collection):
+        if pending[collection]:
+            await target_db[collection].insert_many(pending[collection], ordered=False)
+            counts[collection] += len(pending[collection])
+            pending[collection] = []
+    
+    for idx in range(start, end):
+        rng = random.Random(f"{seed}:{idx}")
+        customer = synthetic_customer(idx, csms, rng, now)
+        pending["customers"].append(customer)
+        pending["activities"].extend(synthetic_activities(customer, activities_per_customer, rng, now))
+        pending["risks"].extend(synthetic_risks(customer, risks_per_customer, rng, now))
+        pending["tasks"].extend(synthetic_tasks(customer, tasks_per_customer, rng, now))
+        for collection, docs in pending.items():
+            if len(docs) >= chunk_size:
+                await flush(collection)
+    for collection in counts:
+        await flush(collection)
+    return counts
+
+def seed_partition(mongo_url, db_name, csms, start, end, options):
+    """Process pool entry point: seed one customer range over the worker's own connection."""
+    async def run():
+        worker_client = AsyncIOMotorClient(mongo_url)
+        try:
+            return await seed_customer_range(worker_client[db_name], csms, start, end, **options)
+        finally:
+            worker_client.close()
+    return asyncio.run(run())
+
+async def seed_synthetic(target_db, customers=30, activities_per_customer=5, risks_per_customer=1,
+                         tasks_per_customer=2, csm_count=None, seed=42, chunk_size=1000, workers=1,
+                         mongo_url=None, now=None):
+    """Seed `target_db` with a generated dataset.
+
+    With `workers` > 1 the customer range is split across processes, each writing through its
+    own client to `mongo_url`; otherwise everything is written through `target_db`, which may
+    be any Motor-compatible database (load_test.py passes mongomock-motor).
+    """
+    now = now or datetime.now(timezone.utc)
+    csm_count = csm_count or max(3, customers // 100)
+    users = synthetic_users(csm_count, now)
+    await target_db.users.insert_many(users)
+    csms = [{"id": user["id"], "name": user["name"], "region": user["region"]} for user in users[1:]]
+    
+    options = {
+        "activities_per_customer": activities_per_customer,
+        "risks_per_customer": risks_per_customer,
+        "tasks_per_customer": tasks_per_customer,
+        "seed": seed,
+        "now": now,
+        "chunk_size": chunk_size,
+    }
+    counts = {"users": len(users), "customers": 0, "activities": 0, "risks": 0, "tasks": 0}
+    if workers <= 1 or not mongo_url:
+        partials = [await seed_customer_range(target_db, csms, 0, customers, **options)]
+    else:
+        bounds = [customers * n // workers for n in range(workers + 1)]
+        loop = asyncio.get_running_loop()
+        # spawn, not fork: the parent already holds an open Motor client
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            partials = await asyncio.gather(*(
+                loop.run_in_executor(pool, seed_partition, mongo_url, target_db.name, csms, start, end, options)
+                for start, end in zip(bounds, bounds[1:]) if end > start
+            ))
+    for partial in partials:
+        for collection, count in partial.items():
+            counts[collection] += count
+    return counts
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Seed the database. Without --customers, loads the 30-account demo dataset; "
+                    "with it, generates a synthetic dataset of that size."
+    )
+    parser.add_argument("--customers", type=int, help="number of synthetic customers to generate")
+    parser.add_argument("--activities-per-customer", type=int, default=5)
+    parser.add_argument("--risks-per-customer", type=int, default=1)
+    parser.add_argument("--tasks-per-customer", type=int, default=2)
+    parser.add_argument("--csms", type=int, help="number of CSM users (default: customers / 100, at least 3)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="generator processes")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+async def seed_generated(args):
+    print(f"Generating {args.customers} customers on {args.workers} worker(s)...")
+    started = datetime.now(timezone.utc)
+    counts = await seed_synthetic(
+        db,
+        customers=args.customers,
+        activities_per_customer=args.activities_per_customer,
+        risks_per_customer=args.risks_per_customer,
+        tasks_per_customer=args.tasks_per_customer,
+        csm_count=args.csms,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        mongo_url=mongo_url
+    )
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    for collection, count in counts.items():
+        print(f"✓ Created {count} {collection}")
+    print(f"✓ Generated in {elapsed:.1f}s")
+    print(f"\nLogin: admin@convin.ai or csm1@convin.ai / {SYNTHETIC_PASSWORD}\n")
+
 async def main():
+    args = parse_args()
     print("=" * 60)
     print("CONVIN.AI CSM TOOL - DATA SEEDING")
     print("=" * 60)
     
     await clear_database()
+    if args.customers is not None:
+        await seed_generated(args)
+        return
     users = await seed_users()
     customers = await seed_customers(users)
     await seed_activities(customers, users)
@@ -1,33 +1,197 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, File, UploadFile
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, File, UploadFile, Query, Request, Response, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument, UpdateMany, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
 import os
+import asyncio
 import logging
 import csv
 import io
+import json
+import re
+import base64
+import tempfile
+import time
+import hashlib
+import random
+import threading
+import socket
+from itertools import islice
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, create_model
+from typing import AsyncIterator, List, Literal, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import bcrypt
+import pandas as pd
 from enum import Enum
+from health_model import DEFAULT_HEALTH_MODEL, CompiledHealthModel, HealthModelConfig
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Request profiling
+# A sampled request carries a RequestProfile in a context variable. Motor runs pymongo calls on
+# executor threads with a copy of the caller's context, so the command listener can attribute
+# each Mongo command to the request that issued it. Unsampled requests skip all bookkeeping.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 20))
+
+class RequestProfile:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Tuple[str, str]] = {}
+        self.commands: Dict[Tuple[str, str], List[float]] = {}  # (command, collection) -> [count, seconds]
+
+request_profile: ContextVar[Optional[RequestProfile]] = ContextVar('request_profile', default=None)
+
+class CommandProfiler(monitoring.CommandListener):
+    def started(self, event):
+        profile = request_profile.get()
+        if profile is None:
+            return
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else str(event.command.get('collection', ''))
+        with profile.lock:
+            profile.pending[event.request_id] = (event.command_name, collection)
+
+    def finished(self, event):
+        profile = request_profile.get()
+        if profile is None:
+            return
+        with profile.lock:
+            key = profile.pending.pop(event.request_id, None)
+            if key:
+                totals = profile.commands.setdefault(key, [0, 0.0])
+                totals[0] += 1
+                totals[1] += event.duration_micros / 1e6
+
+    succeeded = finished
+    failed = finished
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[CommandProfiler()])
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = "HS256"
-JWT_EXPIRATION_HOURS = 168  # 7 days
+JWT_EXPIRATION_HOURS = int(os.environ.get('JWT_EXPIRATION_HOURS', 168))  # 7 days
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+REVOCATION_REFRESH_SECONDS = int(os.environ.get('REVOCATION_REFRESH_SECONDS', 30))
+
+# Index registry: collection -> list of (keys, options). Applied idempotently on startup.
+INDEXES = {
+    "users": [
+        ([("id", 1)], {"unique": True}),
+        ([("email", 1)], {"unique": True}),
+    ],
+    "customers": [
+        ([("id", 1)], {"unique": True}),
+        ([("company_name", 1), ("id", 1)], {}),
+        ([("csm_owner_id", 1), ("company_name", 1)], {}),
+        ([("health_status", 1)], {}),
+        ([("renewal_date", 1), ("id", 1)], {}),
+        ([("company_name", "text"), ("tags", "text"), ("stakeholders.full_name", "text"), ("stakeholders.email", "text")],
+         {"name": "search_text", "weights": {"company_name": 10, "tags": 5, "stakeholders.full_name": 3, "stakeholders.email": 3}}),
+    ],
+    "activities": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1), ("activity_date", -1)], {}),
+        ([("activity_date", -1)], {}),
+        ([("title", "text"), ("summary", "text")], {"name": "search_text", "weights": {"title": 5, "summary": 1}}),
+    ],
+    "risks": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1), ("created_at", -1)], {}),
+        ([("status", 1)], {}),
+        ([("severity", 1)], {}),
+        ([("title", "text"), ("description", "text")], {"name": "search_text", "weights": {"title": 5, "description": 1}}),
+    ],
+    "opportunities": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1), ("created_at", -1)], {}),
+        ([("stage", 1)], {}),
+    ],
+    "tasks": [
+        ([("id", 1)], {"unique": True}),
+        ([("assigned_to_id", 1), ("status", 1), ("due_date", 1)], {}),
+        ([("customer_id", 1), ("due_date", 1)], {}),
+        ([("title", "text")], {"name": "search_text"}),
+    ],
+    "datalabs_reports": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1), ("report_date", -1)], {}),
+    ],
+    "documents": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1), ("created_at", -1)], {}),
+        ([("title", "text"), ("file_name", "text"), ("description", "text")],
+         {"name": "search_text", "weights": {"title": 5, "file_name": 3, "description": 1}}),
+    ],
+    "invoices": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1), ("invoice_date", -1)], {}),
+        ([("status", 1), ("due_date", 1)], {}),
+    ],
+    "jobs": [
+        ([("id", 1)], {"unique": True}),
+        ([("status", 1), ("heartbeat_at", 1)], {}),
+    ],
+    "revoked_tokens": [
+        ([("token_hash", 1)], {"unique": True}),
+        # TTL index: Mongo drops revocations once the token would have expired anyway
+        ([("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ],
+    "health_models": [
+        ([("version", 1)], {"unique": True}),
+        ([("active", 1)], {}),
+    ],
+    "churn_records": [
+        ([("id", 1)], {"unique": True}),
+        ([("customer_id", 1)], {}),
+        ([("churned_at", -1), ("id", -1)], {}),
+    ],
+    "customer_setup": [
+        ([("customer_id", 1)], {}),
+    ],
+    "customer_metrics_history": [
+        ([("customer_id", 1), ("ts", 1)], {}),
+    ],
+    "sync_state": [
+        ([("id", 1)], {"unique": True}),
+    ],
+    "leases": [
+        ([("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ],
+    "customer_metrics_rollups": [
+        ([("customer_id", 1), ("resolution", 1), ("period_start", 1)], {"unique": True}),
+    ],
+}
+
+async def ensure_indexes():
+    for collection, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                await db[collection].create_index(keys, **options)
+            except Exception as e:
+                # A bad index (e.g. duplicates blocking a unique one) must not stop the API from starting
+                logger.error(f"Failed to create index {keys} on {collection}: {e}")
 
 # Create the main app
 app = FastAPI()
@@ -179,6 +343,8 @@ class Customer(BaseModel):
     tags: List[str] = []
     stakeholders: List[Stakeholder] = []
     last_activity_date: Optional[str] = None
+    health_model_version: Optional[int] = None
+    health_override: bool = False  # Set through PUT /customers/{id}/health; model rescoring skips it
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -354,6 +520,180 @@ class DataLabsReportCreate(BaseModel):
     description: Optional[str] = None
     sent_to: List[str] = []
 
+class HealthModelCreate(BaseModel):
+    description: Optional[str] = None
+    base_score: float = 50.0
+    usage_tiers: List[Tuple[float, float]] = [(0.7, 15), (0.5, 10), (0.3, 5)]
+    calls_tiers: List[Tuple[float, float]] = [(1000, 10), (500, 5)]
+    engagement_tiers: List[Tuple[float, float]] = [(7, 15), (14, 10), (30, 5)]
+    onboarding_points: Dict[str, float] = {"Completed": 10, "In Progress": 5}
+    healthy_threshold: float = 80
+    at_risk_threshold: float = 50
+    activate: bool = True
+
+# Metrics
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+def prometheus_escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """Process-local counters, latency summaries and histograms."""
+
+    def __init__(self):
+        self.counters: Dict[Tuple, float] = {}
+        self.gauges: Dict[Tuple, float] = {}
+        self.summaries: Dict[Tuple, Dict[str, float]] = {}
+        self.histograms: Dict[Tuple, Dict[str, Any]] = {}
+
+    @staticmethod
+    def key(name: str, labels: Dict[str, Any]) -> Tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self.key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self.gauges[self.key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        summary = self.summaries.setdefault(self.key(name, labels), {"count": 0, "sum": 0.0, "max": 0.0})
+        summary['count'] += 1
+        summary['sum'] += seconds
+        summary['max'] = max(summary['max'], seconds)
+
+    def histogram(self, name: str, value: float, buckets: Tuple = LATENCY_BUCKETS, **labels):
+        key = self.key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "count": 0, "sum": 0.0}
+        histogram['counts'][bisect_left(buckets, value)] += 1
+        histogram['count'] += 1
+        histogram['sum'] += value
+
+    def snapshot(self) -> Dict:
+        def label(key: Tuple) -> str:
+            name, labels = key
+            return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+        return {
+            "counters": {label(key): value for key, value in self.counters.items()},
+            "gauges": {label(key): value for key, value in self.gauges.items()},
+            "summaries": {label(key): dict(summary) for key, summary in self.summaries.items()},
+            "histograms": {
+                label(key): {"count": histogram['count'], "sum": histogram['sum']}
+                for key, histogram in self.histograms.items()
+            }
+        }
+
+    def prometheus(self) -> str:
+        """Render everything in the Prometheus text exposition format."""
+        lines = []
+        
+        def sample(name: str, labels: Tuple, value: float, extra: Tuple = ()):
+            pairs = ",".join(f'{k}="{prometheus_escape(v)}"' for k, v in (*labels, *extra))
+            lines.append(f"{name}{{{pairs}}} {value}" if pairs else f"{name} {value}")
+        
+        def families(items: Dict[Tuple, Any], kind: str):
+            declared = None
+            for (name, labels), value in sorted(items.items(), key=lambda item: item[0]):
+                if name != declared:
+                    lines.append(f"# TYPE {name} {kind}")
+                    declared = name
+                yield name, labels, value
+        
+        for name, labels, value in families(self.counters, "counter"):
+            sample(name, labels, value)
+        for name, labels, value in families(self.gauges, "gauge"):
+            sample(name, labels, value)
+        for name, labels, summary in families(self.summaries, "summary"):
+            sample(f"{name}_count", labels, summary['count'])
+            sample(f"{name}_sum", labels, summary['sum'])
+        for name, labels, histogram in families(self.histograms, "histogram"):
+            cumulative = 0
+            for bound, count in zip((*histogram['buckets'], "+Inf"), histogram['counts']):
+                cumulative += count
+                sample(f"{name}_bucket", labels, cumulative, (("le", bound),))
+            sample(f"{name}_count", labels, histogram['count'])
+            sample(f"{name}_sum", labels, histogram['sum'])
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+# List serialization
+# List endpoints hand raw documents to a prebuilt TypeAdapter, which parses the stored ISO
+# timestamps itself, and return the JSON it writes. Returning a Response skips FastAPI's own
+# response_model pass, which would validate and encode every row a second time; the
+# response_model stays on the route for the OpenAPI schema.
+@lru_cache(maxsize=None)
+def list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def list_response(model: type, documents: List[Dict], headers: Optional[Dict[str, str]] = None,
+                  request: Optional[Request] = None) -> Response:
+    adapter = list_adapter(model)
+    headers = dict(headers or {})
+    if request is not None:
+        headers['ETag'] = document_etag(documents, schema_fingerprint(model))
+        headers['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+        if etag_matches(request, headers['ETag']):
+            return not_modified(headers)
+    return Response(adapter.dump_json(adapter.validate_python(documents)), media_type="application/json", headers=headers)
+
+# Conditional GET
+# Read endpoints send an ETag and answer a matching If-None-Match with 304. For model
+# responses the tag is a digest of the stored documents (as BSON) plus the model schema, so it
+# is computed before any validation or serialization and a repeat load costs one query and a
+# hash. Every writer changes the stored document, so this catches rescoring and name
+# propagation, which don't touch updated_at, and writes made by other workers. Report bodies
+# are digested after encoding. The tags are weak: the same body goes out gzipped or not
+# (CompressionMiddleware adds Vary: Accept-Encoding), and a strong tag would claim the two
+# are byte-identical. "no-cache" makes browsers revalidate instead of reusing blindly.
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+@lru_cache(maxsize=None)
+def schema_fingerprint(model: type) -> bytes:
+    # A deploy that changes the model changes the body for the same documents
+    return hashlib.blake2b(json.dumps(model.model_json_schema(), sort_keys=True).encode(), digest_size=8).digest()
+
+def document_etag(documents: List[Dict], salt: bytes = b"") -> str:
+    digest = hashlib.blake2b(salt, digest_size=16)
+    for document in documents:
+        digest.update(bson.encode(document))
+    return f'W/"{digest.hexdigest()}"'
+
+def body_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    opaque_tag = etag.removeprefix("W/")
+    return opaque_tag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+def model_response(model: type, document: Dict, request: Request) -> Response:
+    etag = document_etag([document], schema_fingerprint(model))
+    headers = {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    return Response(model.model_validate(document).model_dump_json(), media_type="application/json", headers=headers)
+
+def conditional_json(content: Any, request: Request) -> Response:
+    # Same encoding as JSONResponse
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    headers = {"ETag": body_etag(body), "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+    if etag_matches(request, headers['ETag']):
+        return not_modified(headers)
+    return Response(body, media_type="application/json", headers=headers)
+
 # Helper Functions
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -361,72 +701,708 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+# bcrypt takes 100-300 ms of CPU per call, so password work runs on a small dedicated pool.
+# Once PASSWORD_HASH_MAX_PENDING calls are queued or running, new ones get a 429 rather than
+# piling up behind the pool.
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+password_jobs_pending = 0
+
+async def run_password_job(fn, *args):
+    global password_jobs_pending
+    if password_jobs_pending >= PASSWORD_HASH_MAX_PENDING:
+        metrics.inc("password_jobs_rejected_total")
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many sign-in requests, please retry",
+                            headers={"Retry-After": "1"})
+    
+    password_jobs_pending += 1
+    metrics.set("password_jobs_pending", password_jobs_pending)
+    metrics.set("password_jobs_queued", max(0, password_jobs_pending - PASSWORD_HASH_WORKERS))
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, fn, *args)
+    finally:
+        password_jobs_pending -= 1
+        metrics.set("password_jobs_pending", password_jobs_pending)
+        metrics.set("password_jobs_queued", max(0, password_jobs_pending - PASSWORD_HASH_WORKERS))
+        metrics.observe("password_job_seconds", time.perf_counter() - started, op=fn.__name__)
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await run_password_job(verify_password, password, hashed)
+
 def create_access_token(user_id: str, email: str, role: str) -> str:
     payload = {
         'user_id': user_id,
         'email': email,
         'role': role,
+        # Unique per token, so a new login never reproduces a revoked token
+        'jti': str(uuid.uuid4()),
         'exp': datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+# Verified token cache
+class TokenCache:
+    """LRU of verified JWT payloads keyed by token hash; an entry lives no longer than its token."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict]:
+        payload = self.entries.get(key)
+        if payload is None:
+            return None
+        if payload['exp'] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return payload
+
+    def put(self, key: str, payload: Dict):
+        self.entries[key] = payload
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def discard(self, key: str):
+        self.entries.pop(key, None)
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+# token hash -> expiry (epoch seconds), mirrored from the revoked_tokens collection
+revoked_tokens: Dict[str, float] = {}
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+async def load_revoked_tokens():
+    now = datetime.now(timezone.utc)
+    docs = await db.revoked_tokens.find({"expires_at": {"$gt": now}}, {"_id": 0}).to_list(None)
+    # Merge in place: a logout handled by this worker while the query ran must not be dropped.
+    # Revocations are never lifted, so the only removals are entries past their expiry.
+    for doc in docs:
+        revoked_tokens[doc['token_hash']] = doc['expires_at'].replace(tzinfo=timezone.utc).timestamp()
+    expired = [key for key, expires_at in revoked_tokens.items() if expires_at <= now.timestamp()]
+    for key in expired:
+        del revoked_tokens[key]
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
+    return authenticate_token(credentials.credentials)
+
+def authenticate_token(token: str) -> Dict:
+    key = token_key(token)
+    if key in revoked_tokens:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    
+    payload = token_cache.get(key)
+    if payload is not None:
+        metrics.inc("auth_token_cache_total", result="hit")
+        return payload
+    metrics.inc("auth_token_cache_total", result="miss")
+    
+    started = time.perf_counter()
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    finally:
+        metrics.observe("auth_decode_seconds", time.perf_counter() - started)
+    if 'purpose' in payload:
+        # Single-purpose tickets (see /events/ticket) are not API credentials
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    
+    token_cache.put(key, payload)
+    return payload
+
+def require_admin(current_user: Dict = Depends(get_current_user)) -> Dict:
+    if current_user.get('role') != UserRole.ADMIN.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+# Health scoring
+# The active model is compiled once and swapped only when the active version changes,
+# so scoring a customer never reads configuration from the database.
+HEALTH_MODEL_POLL_SECONDS = int(os.environ.get('HEALTH_MODEL_POLL_SECONDS', 60))
+health_model = CompiledHealthModel(DEFAULT_HEALTH_MODEL)
+
+async def load_health_model():
+    global health_model
+    active = await db.health_models.find_one({"active": True}, {"_id": 0, "version": 1})
+    if not active:
+        default_dict = DEFAULT_HEALTH_MODEL.model_dump()
+        default_dict['created_at'] = default_dict['created_at'].isoformat()
+        await db.health_models.update_one(
+            {"version": DEFAULT_HEALTH_MODEL.version},
+            {"$setOnInsert": default_dict},
+            upsert=True
+        )
+        return
+    if active['version'] != health_model.version:
+        config = await db.health_models.find_one({"version": active['version']}, {"_id": 0})
+        health_model = CompiledHealthModel(HealthModelConfig(**config))
+        logger.info(f"Loaded health model version {health_model.version}")
 
 def calculate_health_score(customer: Dict) -> float:
-    score = 50.0
-    
-    # Usage score (40% weight)
-    if customer.get('active_users', 0) > 0 and customer.get('total_licensed_users', 0) > 0:
-        usage_rate = customer['active_users'] / customer['total_licensed_users']
-        if usage_rate >= 0.7:
-            score += 15
-        elif usage_rate >= 0.5:
-            score += 10
-        elif usage_rate >= 0.3:
-            score += 5
-    
-    if customer.get('calls_processed', 0) > 1000:
-        score += 10
-    elif customer.get('calls_processed', 0) > 500:
-        score += 5
-    
-    # Engagement score (25% weight)
-    last_activity = customer.get('last_activity_date')
-    if last_activity:
-        try:
-            days_since = (datetime.now(timezone.utc) - datetime.fromisoformat(last_activity)).days
-            if days_since < 7:
-                score += 15
-            elif days_since < 14:
-                score += 10
-            elif days_since < 30:
-                score += 5
-        except:
-            pass
-    
-    # Onboarding status (10% weight)
-    if customer.get('onboarding_status') == 'Completed':
-        score += 10
-    elif customer.get('onboarding_status') == 'In Progress':
-        score += 5
-    
-    return min(100, max(0, score))
+    return health_model.score(customer)
 
 def determine_health_status(score: float) -> str:
-    if score >= 80:
-        return "Healthy"
-    elif score >= 50:
-        return "At Risk"
-    else:
-        return "Critical"
+    return health_model.status(score)
+
+# Customer metrics history
+# Every health score or ARR change appends a point to customer_metrics_history, a time-series
+# collection keyed by customer_id (so `ts` is a BSON datetime, not an ISO string). Daily, weekly
+# and monthly rollups are upserted alongside so trend charts read one document per period.
+HISTORY_RESOLUTIONS = ("day", "week", "month")
+HISTORY_DEFAULT_RANGE_DAYS = 365
+
+async def ensure_history_collection():
+    try:
+        await db.create_collection(
+            "customer_metrics_history",
+            timeseries={"timeField": "ts", "metaField": "customer_id", "granularity": "hours"}
+        )
+    except CollectionInvalid:
+        pass  # Already exists
+    except OperationFailure as e:
+        # Servers before 5.0 have no time-series collections; the first insert creates a regular one
+        logger.warning(f"Time-series collection unavailable, using a regular collection: {e}")
+
+def history_period(ts: datetime, resolution: str) -> str:
+    day = ts.date()
+    if resolution == "week":
+        day -= timedelta(days=day.weekday())
+    elif resolution == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
+def history_point(customer: Dict, ts: Optional[datetime] = None) -> Dict:
+    return {
+        "customer_id": customer['id'],
+        "ts": ts or datetime.now(timezone.utc),
+        "health_score": float(rollup_number(customer.get('health_score'))),
+        "health_status": customer.get('health_status'),
+        "arr": float(rollup_number(customer.get('arr'))),
+    }
+
+def metrics_changed(old: Dict, new: Dict) -> bool:
+    return old.get('health_score') != new.get('health_score') or old.get('arr') != new.get('arr')
+
+async def record_metrics_history(points: List[Dict]):
+    if not points:
+        return
+    await db.customer_metrics_history.insert_many(points, ordered=False)
+    
+    operations = []
+    for point in points:
+        score = point['health_score']
+        for resolution in HISTORY_RESOLUTIONS:
+            operations.append(UpdateOne(
+                {"customer_id": point['customer_id'], "resolution": resolution,
+                 "period_start": history_period(point['ts'], resolution)},
+                {
+                    "$inc": {"samples": 1, "health_score_sum": score},
+                    "$min": {"health_score_min": score, "arr_min": point['arr']},
+                    "$max": {"health_score_max": score, "arr_max": point['arr'], "last_ts": point['ts']},
+                    # Closing values; writers stamp points with the current time, so the last write wins
+                    "$set": {"health_score": score, "health_status": point['health_status'], "arr": point['arr']},
+                },
+                upsert=True
+            ))
+    await db.customer_metrics_rollups.bulk_write(operations, ordered=False)
+
+# Batch health score recomputation
+# Scores whole batches of customers with CompiledHealthModel.score_frame. The engagement term
+# depends on the current time, so scores are refreshed on a schedule.
+HEALTH_RECOMPUTE_INTERVAL_SECONDS = int(os.environ.get('HEALTH_RECOMPUTE_INTERVAL_SECONDS', 24 * 3600))
+HEALTH_RECOMPUTE_BATCH_SIZE = 10000
+HEALTH_INPUT_FIELDS = ["id", "arr", "active_users", "total_licensed_users", "calls_processed", "last_activity_date",
+                       "onboarding_status", "health_score", "health_status", "health_model_version"]
+
+async def rescore_batch(batch: List[Dict], model: CompiledHealthModel, now: datetime) -> int:
+    frame = pd.DataFrame.from_records(batch, columns=HEALTH_INPUT_FIELDS)
+    scores = model.score_frame(frame, now)
+    statuses = model.status_array(scores)
+    changed = (scores != pd.to_numeric(frame['health_score'], errors='coerce').to_numpy(dtype=float)) | \
+              (statuses != frame['health_status'].to_numpy()) | \
+              (frame['health_model_version'].to_numpy() != model.version)
+    
+    # Each write applies only if the customer still has the score and version it was read with
+    # and no override: a manual override or edit that lands mid-batch wins over the snapshot
+    operations = [
+        UpdateOne({
+            "id": batch[index]['id'],
+            "health_override": {"$ne": True},
+            "health_score": batch[index].get('health_score'),
+            "health_model_version": batch[index].get('health_model_version'),
+        }, {"$set": {
+            "health_score": float(scores[index]),
+            "health_status": str(statuses[index]),
+            "health_model_version": model.version
+        }})
+        for index in changed.nonzero()[0]
+    ]
+    if not operations:
+        return 0
+    result = await db.customers.bulk_write(operations, ordered=False)
+    scored = frame[changed].assign(
+        health_score=scores[changed],
+        health_status=statuses[changed],
+        arr=pd.to_numeric(frame['arr'][changed], errors='coerce').fillna(0)
+    )
+    if result.matched_count < len(operations):
+        # Some customers changed under us; record history only for the writes that applied
+        written = await db.customers.find(
+            {"id": {"$in": scored['id'].tolist()}, "health_model_version": model.version},
+            {"_id": 0, "id": 1, "health_score": 1}
+        ).to_list(None)
+        written_scores = {doc['id']: doc.get('health_score') for doc in written}
+        scored = scored[[written_scores.get(customer_id) == score
+                         for customer_id, score in zip(scored['id'], scored['health_score'])]]
+    moved = scored['health_score'].to_numpy() != pd.to_numeric(frame['health_score'][scored.index], errors='coerce').to_numpy(dtype=float)
+    await record_metrics_history([
+        history_point(customer, now) for customer in scored[moved].to_dict('records')
+    ])
+    return result.matched_count
+
+async def recompute_health_scores(only_stale: bool = False) -> Dict:
+    """Rescore customers with the active model; `only_stale` limits it to other model versions."""
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    model = health_model
+    scanned = 0
+    updated = 0
+    batch = []
+    
+    # Churned accounts are pinned at 0/Critical by record_customer_churn, and manual
+    # overrides stand until cleared through DELETE /customers/{id}/health
+    query = {"account_status": {"$ne": "Churn"}, "health_override": {"$ne": True}}
+    if only_stale:
+        query['health_model_version'] = {"$ne": model.version}
+    cursor = db.customers.find(
+        query,
+        {"_id": 0, **{field: 1 for field in HEALTH_INPUT_FIELDS}}
+    ).batch_size(HEALTH_RECOMPUTE_BATCH_SIZE)
+    async for customer in cursor:
+        batch.append(customer)
+        if len(batch) >= HEALTH_RECOMPUTE_BATCH_SIZE:
+            scanned += len(batch)
+            updated += await rescore_batch(batch, model, now)
+            batch = []
+    if batch:
+        scanned += len(batch)
+        updated += await rescore_batch(batch, model, now)
+    
+    if updated:
+        await invalidate_rollups()
+    
+    duration = time.perf_counter() - started
+    logger.info(f"Health recompute scanned {scanned} customers, updated {updated} in {duration:.2f}s")
+    return {"scanned": scanned, "updated": updated, "model_version": model.version, "duration_seconds": round(duration, 3)}
+
+# User directory cache
+# Write handlers denormalize user names onto documents. This keeps a snapshot of the users
+# collection in memory, refreshed after USER_CACHE_TTL_SECONDS and updated on registration.
+USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 300))
+
+class UserDirectory:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.by_id: Dict[str, Dict] = {}
+        self.by_email: Dict[str, Dict] = {}
+        self.loaded_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl_seconds
+
+    async def refresh(self):
+        async with self.lock:
+            if not self.is_stale():
+                return
+            users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(None)
+            self.by_id = {user['id']: user for user in users}
+            self.by_email = {user['email']: user for user in users}
+            self.loaded_at = time.monotonic()
+
+    def put(self, user: Dict):
+        self.by_id[user['id']] = user
+        self.by_email[user['email']] = user
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    async def get(self, user_id: Optional[str]) -> Optional[Dict]:
+        if not user_id:
+            return None
+        if self.is_stale():
+            await self.refresh()
+        user = self.by_id.get(user_id)
+        if user is None:
+            # May have registered on another worker since the last refresh
+            user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+            if user:
+                self.put(user)
+        return user
+
+    async def all(self) -> List[Dict]:
+        if self.is_stale():
+            await self.refresh()
+        return list(self.by_id.values())
+
+user_directory = UserDirectory(USER_CACHE_TTL_SECONDS)
+
+# Change streams
+# The name propagator and the /events hub follow change streams, which need a replica set or a
+# sharded cluster. Support is checked once per worker at startup; without it (a standalone
+# mongod, or mongomock in development) neither job is started and one warning is logged.
+change_streams_available = False
+
+async def detect_change_streams() -> bool:
+    try:
+        hello = await db.command("hello")
+    except Exception as e:
+        logger.warning(f"Could not check for change stream support, name propagation and /events are off: {e}")
+        return False
+    if hello.get('setName') or hello.get('msg') == "isdbgrid":
+        return True
+    logger.warning("MongoDB is not a replica set or sharded cluster, name propagation and /events are off")
+    return False
+
+# Leases
+# A job that must run on exactly one worker holds a lease document in `leases`. The holder
+# renews it well inside LEASE_SECONDS; if the holder dies, the lease expires and another
+# worker's next attempt takes it over. Periodic jobs that every worker schedules but only one
+# should run (see leased_job) hold their lease for most of an interval instead, so the other
+# workers' timers, which fire at about the same time, find it taken.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+LEASE_SECONDS = int(os.environ.get('LEASE_SECONDS', 30))
+
+async def acquire_lease(name: str, seconds: int = LEASE_SECONDS) -> bool:
+    """Take or renew the lease; False while another worker holds it."""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.leases.update_one(
+            {"_id": name, "$or": [{"holder": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"holder": WORKER_ID, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The lease exists, is unexpired and belongs to someone else, so the upsert's insert collided
+        return False
+    return True
+
+async def release_lease(name: str):
+    await db.leases.delete_one({"_id": name, "holder": WORKER_ID})
+
+def leased_job(name: str, interval_seconds: int, job):
+    """`job` for start_periodic, run only by the worker that takes the `name` lease this interval."""
+    async def run():
+        # Expires a little before the holder's next run, so a dead holder is replaced next interval
+        if await acquire_lease(name, interval_seconds * 9 // 10):
+            await job()
+    return run
+
+# Denormalized name propagation
+# Write handlers copy customer and user names onto dependent documents so list endpoints never
+# join. A change stream on customers and users pushes renames out to those copies in unordered
+# bulk writes. Only the worker holding the "name_propagator" lease follows the stream, so each
+# rename is applied once and one writer owns the resume token in sync_state; renames made while
+# no worker was listening are applied on restart. Change streams need a replica set; on a
+# standalone server the propagator stays off, and /admin/names/resync repairs copies on demand.
+# Churn records keep the names as they were at churn time and are deliberately left alone.
+NAME_COPIES = {
+    "customers": ("company_name", [
+        ("activities", "customer_id", "customer_name"),
+        ("risks", "customer_id", "customer_name"),
+        ("opportunities", "customer_id", "customer_name"),
+        ("tasks", "customer_id", "customer_name"),
+        ("datalabs_reports", "customer_id", "customer_name"),
+    ]),
+    "users": ("name", [
+        ("customers", "csm_owner_id", "csm_owner_name"),
+        ("customers", "am_owner_id", "am_owner_name"),
+        ("activities", "csm_id", "csm_name"),
+        ("risks", "assigned_to_id", "assigned_to_name"),
+        ("opportunities", "owner_id", "owner_name"),
+        ("tasks", "assigned_to_id", "assigned_to_name"),
+        ("tasks", "created_by_id", "created_by_name"),
+        ("datalabs_reports", "created_by_id", "created_by_name"),
+        ("documents", "created_by_id", "created_by_name"),
+        ("invoices", "created_by_id", "created_by_name"),
+    ]),
+}
+NAME_PROPAGATION_MAX_WAIT_MS = int(os.environ.get('NAME_PROPAGATION_MAX_WAIT_MS', 1000))
+NAME_PROPAGATION_BATCH_SIZE = 500
+NAME_PROPAGATION_RETRY_SECONDS = int(os.environ.get('NAME_PROPAGATION_RETRY_SECONDS', 30))
+NAME_PROPAGATION_CHECKPOINT_SECONDS = 60
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573}  # $changeStream on a standalone server
+CHANGE_STREAM_HISTORY_LOST_CODES = {260, 280, 286}  # Resume point no longer in the oplog
+name_propagation_disabled = False
+
+async def propagate_names(source: str, names: Dict[str, Optional[str]]) -> int:
+    """Rewrite the copies of `names` (source document id -> current name); returns documents modified."""
+    if not names:
+        return 0
+    _, targets = NAME_COPIES[source]
+    operations: Dict[str, List] = {}
+    for collection, id_field, name_field in targets:
+        operations.setdefault(collection, []).extend(
+            UpdateMany({id_field: source_id, name_field: {"$ne": name}}, {"$set": {name_field: name}})
+            for source_id, name in names.items()
+        )
+    results = await asyncio.gather(*(
+        db[collection].bulk_write(ops, ordered=False) for collection, ops in operations.items()
+    ))
+    if source == "users":
+        user_directory.invalidate()
+    return sum(result.modified_count for result in results)
+
+def name_change_pipeline() -> List[Dict]:
+    renamed = [
+        {"ns.coll": source, "$or": [
+            {"operationType": "replace"},
+            {f"updateDescription.updatedFields.{field}": {"$exists": True}},
+        ]}
+        for source, (field, _) in NAME_COPIES.items()
+    ]
+    return [
+        {"$match": {"$or": renamed}},
+        {"$project": {"ns": 1, **{f"fullDocument.{field}": 1 for field, _ in NAME_COPIES.values()}, "fullDocument.id": 1}},
+    ]
+
+async def flush_name_changes(pending: Dict[str, Dict[str, Optional[str]]]) -> bool:
+    flushed = False
+    for source, names in pending.items():
+        if names:
+            modified = await propagate_names(source, names)
+            logger.info(f"Propagated {len(names)} {source} rename(s) to {modified} document(s)")
+            names.clear()
+            flushed = True
+    return flushed
+
+async def save_resume_token(resume_token: Optional[Dict]):
+    if resume_token:
+        await db.sync_state.update_one(
+            {"id": "name_propagator"},
+            {"$set": {"resume_token": resume_token, "updated_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True
+        )
+
+async def run_name_propagator():
+    """Follow renames until the stream closes; restarted by run_periodic after an error."""
+    global name_propagation_disabled
+    if name_propagation_disabled or not await acquire_lease("name_propagator"):
+        return
+    state = await db.sync_state.find_one({"id": "name_propagator"}, {"_id": 0})
+    resume_token = state.get('resume_token') if state else None
+    pending: Dict[str, Dict[str, Optional[str]]] = {source: {} for source in NAME_COPIES}
+    checkpointed_at = renewed_at = time.monotonic()
+    try:
+        async with db.watch(
+            name_change_pipeline(),
+            full_document="updateLookup",
+            resume_after=resume_token,
+            max_await_time_ms=NAME_PROPAGATION_MAX_WAIT_MS
+        ) as stream:
+            logger.info("Name propagator watching customers and users")
+            while stream.alive:
+                if time.monotonic() - renewed_at > LEASE_SECONDS / 3:
+                    if not await acquire_lease("name_propagator"):
+                        logger.warning("Name propagator lost its lease, stopping on this worker")
+                        return
+                    renewed_at = time.monotonic()
+                change = await stream.try_next()
+                if change is not None:
+                    document = change.get('fullDocument')
+                    if document:  # None when the document was deleted before the lookup
+                        source = change['ns']['coll']
+                        pending[source][document['id']] = document.get(NAME_COPIES[source][0])
+                    if sum(len(names) for names in pending.values()) < NAME_PROPAGATION_BATCH_SIZE:
+                        continue
+                # Stream is idle (or the batch is full): apply what has accumulated. The token
+                # also advances past unrelated writes, so checkpoint it now and then even when
+                # nothing was renamed, to keep it inside the oplog window.
+                flushed = await flush_name_changes(pending)
+                if flushed or time.monotonic() - checkpointed_at > NAME_PROPAGATION_CHECKPOINT_SECONDS:
+                    await save_resume_token(stream.resume_token)
+                    checkpointed_at = time.monotonic()
+    except OperationFailure as e:
+        if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+            name_propagation_disabled = True
+            logger.warning(f"Change streams unavailable, name propagation disabled: {e}")
+            return
+        if e.code in CHANGE_STREAM_HISTORY_LOST_CODES:
+            # Too far behind to resume; drop the token and repair everything instead
+            logger.warning(f"Name propagator can't resume, resyncing all names: {e}")
+            await db.sync_state.delete_one({"id": "name_propagator"})
+            await resync_names()
+            return
+        raise
+
+async def resync_names() -> Dict[str, int]:
+    """Rewrite every denormalized name from the customers and users collections."""
+    modified = {}
+    for source, (field, _) in NAME_COPIES.items():
+        modified[source] = 0
+        names = {}
+        async for document in db[source].find({}, {"_id": 0, "id": 1, field: 1}):
+            names[document['id']] = document.get(field)
+            if len(names) >= NAME_PROPAGATION_BATCH_SIZE:
+                modified[source] += await propagate_names(source, names)
+                names = {}
+        modified[source] += await propagate_names(source, names)
+    return modified
+
+# Typeahead
+# Customer and user pickers query an in-memory PrefixIndex per worker instead of loading full
+# lists. Each entry is indexed under its whole name and under every later word ("HDFC Bank"
+# is found by "hd" and by "ba"); a lookup is a bisect into the sorted keys plus a short scan.
+# Write handlers keep the local index current; the periodic reload picks up writes made on
+# other workers. Local writes made while a reload reads its snapshot are replayed onto the new
+# list before it replaces the old one.
+TYPEAHEAD_REFRESH_SECONDS = int(os.environ.get('TYPEAHEAD_REFRESH_SECONDS', 300))
+TYPEAHEAD_FIELDS = {
+    "customers": ("company_name", ["id", "company_name", "region", "csm_owner_id"]),
+    "users": ("name", ["id", "name", "email", "role"]),
+}
+
+class PrefixIndex:
+    def __init__(self, extra_keys=()):
+        self.extra_keys = extra_keys  # Other fields matched by prefix, e.g. user email
+        self.keys: List[Tuple[str, str]] = []  # (normalized text, id), sorted
+        self.entries: Dict[str, Dict] = {}
+        self.entry_keys: Dict[str, List[Tuple[str, str]]] = {}
+        # While a reload is reading from the database: id -> (name, entry), or None if removed
+        self.pending: Optional[Dict[str, Optional[Tuple[str, Dict]]]] = None
+        self.reloads = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.casefold().split())
+
+    def index_keys(self, entry_id: str, name: str, entry: Dict) -> List[Tuple[str, str]]:
+        words = self.normalize(name or "").split(" ")
+        texts = {" ".join(words[i:]) for i in range(len(words))}
+        texts.update(self.normalize(str(entry[key])) for key in self.extra_keys if entry.get(key))
+        return [(text, entry_id) for text in texts if text]
+
+    def put(self, entry_id: str, name: str, entry: Dict):
+        self.remove(entry_id)
+        keys = self.index_keys(entry_id, name, entry)
+        for key in keys:
+            insort(self.keys, key)
+        self.entries[entry_id] = entry
+        self.entry_keys[entry_id] = keys
+        if self.pending is not None:
+            self.pending[entry_id] = (name, entry)
+
+    def put_many(self, entries: List[Tuple[str, str, Dict]]):
+        """put() for a batch: one sort per call instead of an insort per key."""
+        latest = {entry_id: (name, entry) for entry_id, name, entry in entries}
+        for entry_id in latest:
+            self.remove(entry_id)
+        for entry_id, (name, entry) in latest.items():
+            keys = self.index_keys(entry_id, name, entry)
+            self.keys.extend(keys)
+            self.entries[entry_id] = entry
+            self.entry_keys[entry_id] = keys
+            if self.pending is not None:
+                self.pending[entry_id] = (name, entry)
+        self.keys.sort()
+
+    def remove(self, entry_id: str):
+        for key in self.entry_keys.pop(entry_id, []):
+            index = bisect_left(self.keys, key)
+            if index < len(self.keys) and self.keys[index] == key:
+                del self.keys[index]
+        self.entries.pop(entry_id, None)
+        if self.pending is not None:
+            self.pending[entry_id] = None
+
+    def begin_load(self):
+        """Start recording puts and removes, to be replayed onto the list load() builds."""
+        self.reloads += 1
+        if self.pending is None:
+            self.pending = {}
+
+    def load(self, entries: List[Tuple[str, str, Dict]]):
+        latest = {entry_id: (name, entry) for entry_id, name, entry in entries}
+        # Puts and removes made while the snapshot was being read are at least as new as it
+        for entry_id, change in (self.pending or {}).items():
+            if change is None:
+                latest.pop(entry_id, None)
+            else:
+                latest[entry_id] = change
+        keys, by_id, entry_keys = [], {}, {}
+        for entry_id, (name, entry) in latest.items():
+            entry_keys[entry_id] = self.index_keys(entry_id, name, entry)
+            keys.extend(entry_keys[entry_id])
+            by_id[entry_id] = entry
+        keys.sort()
+        self.keys, self.entries, self.entry_keys = keys, by_id, entry_keys
+
+    def end_load(self):
+        self.reloads -= 1
+        if not self.reloads:
+            self.pending = None
+
+    def search(self, prefix: str, limit: int) -> List[Dict]:
+        prefix = self.normalize(prefix)
+        results, seen = [], set()
+        index = bisect_left(self.keys, (prefix, ""))
+        while index < len(self.keys) and len(results) < limit:
+            text, entry_id = self.keys[index]
+            if not text.startswith(prefix):
+                break
+            if entry_id not in seen:
+                seen.add(entry_id)
+                results.append(self.entries[entry_id])
+            index += 1
+        return results
+
+typeahead_indexes = {
+    "customers": PrefixIndex(),
+    "users": PrefixIndex(extra_keys=("email",)),
+}
+
+def typeahead_put(kind: str, document: Dict):
+    name_field, fields = TYPEAHEAD_FIELDS[kind]
+    typeahead_indexes[kind].put(document['id'], document.get(name_field), {field: document.get(field) for field in fields})
+
+def typeahead_put_many(kind: str, documents: List[Dict]):
+    name_field, fields = TYPEAHEAD_FIELDS[kind]
+    typeahead_indexes[kind].put_many([
+        (document['id'], document.get(name_field), {field: document.get(field) for field in fields})
+        for document in documents
+    ])
+
+async def load_typeahead():
+    for kind, (name_field, fields) in TYPEAHEAD_FIELDS.items():
+        index = typeahead_indexes[kind]
+        index.begin_load()
+        try:
+            documents = await db[kind].find({}, {"_id": 0, **{field: 1 for field in fields}}).to_list(None)
+            index.load([(doc['id'], doc.get(name_field), doc) for doc in documents])
+        finally:
+            index.end_load()
+
+@api_router.get("/typeahead/{kind}")
+async def typeahead(
+    kind: str,
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Dict = Depends(get_current_user)
+):
+    if kind not in typeahead_indexes:
+        raise HTTPException(status_code=404, detail="Unknown typeahead source")
+    return {"results": typeahead_indexes[kind].search(q, limit)}
 
 # Authentication Routes
 @api_router.post("/auth/register", response_model=Token)
@@ -444,10 +1420,12 @@ async def register(user_data: UserCreate):
     )
     
     user_dict = user.model_dump()
-    user_dict['password'] = hash_password(user_data.password)
+    user_dict['password'] = await hash_password_async(user_data.password)
     user_dict['created_at'] = user_dict['created_at'].isoformat()
     
     await db.users.insert_one(user_dict)
+    user_directory.put({k: v for k, v in user_dict.items() if k not in ('_id', 'password')})
+    typeahead_put("users", user_dict)
     
     token = create_access_token(user.id, user.email, user.role)
     
@@ -457,7 +1435,7 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     user_dict = await db.users.find_one({"email": credentials.email})
     
-    if not user_dict or not verify_password(credentials.password, user_dict['password']):
+    if not user_dict or not await verify_password_async(credentials.password, user_dict['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if isinstance(user_dict['created_at'], str):
@@ -468,25 +1446,32 @@ async def login(credentials: UserLogin):
     
     return Token(access_token=token, user=user)
 
+@api_router.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security), current_user: Dict = Depends(get_current_user)):
+    key = token_key(credentials.credentials)
+    expires_at = datetime.fromtimestamp(current_user['exp'], tz=timezone.utc)
+    await db.revoked_tokens.update_one(
+        {"token_hash": key},
+        {"$set": {"token_hash": key, "user_id": current_user['user_id'], "expires_at": expires_at}},
+        upsert=True
+    )
+    revoked_tokens[key] = expires_at.timestamp()
+    token_cache.discard(key)
+    return {"message": "Logged out successfully"}
+
 @api_router.get("/auth/me", response_model=User)
 async def get_me(current_user: Dict = Depends(get_current_user)):
-    user_dict = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0, "password": 0})
+    user_dict = await user_directory.get(current_user['user_id'])
     if not user_dict:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if isinstance(user_dict['created_at'], str):
-        user_dict['created_at'] = datetime.fromisoformat(user_dict['created_at'])
-    
     return User(**user_dict)
 
 # User Routes
 @api_router.get("/users", response_model=List[User])
 async def get_users(current_user: Dict = Depends(get_current_user)):
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    for user in users:
-        if isinstance(user['created_at'], str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
-    return users
+    # Cached dicts are shared, so leave created_at as stored and let the response model parse it
+    return await user_directory.all()
 
 # Customer Routes
 @api_router.post("/customers", response_model=Customer)
@@ -494,13 +1479,13 @@ async def create_customer(customer_data: CustomerCreate, current_user: Dict = De
     # Get CSM details if provided
     csm_name = None
     if customer_data.csm_owner_id:
-        csm = await db.users.find_one({"id": customer_data.csm_owner_id}, {"_id": 0})
+        csm = await user_directory.get(customer_data.csm_owner_id)
         if csm:
             csm_name = csm['name']
     
     am_name = None
     if customer_data.am_owner_id:
-        am = await db.users.find_one({"id": customer_data.am_owner_id}, {"_id": 0})
+        am = await user_directory.get(customer_data.am_owner_id)
         if am:
             am_name = am['name']
     
@@ -514,10 +1499,14 @@ async def create_customer(customer_data: CustomerCreate, current_user: Dict = De
     customer_dict = customer.model_dump()
     customer_dict['health_score'] = calculate_health_score(customer_dict)
     customer_dict['health_status'] = determine_health_status(customer_dict['health_score'])
+    customer_dict['health_model_version'] = health_model.version
     customer_dict['created_at'] = customer_dict['created_at'].isoformat()
     customer_dict['updated_at'] = customer_dict['updated_at'].isoformat()
     
     await db.customers.insert_one(customer_dict)
+    await apply_rollup(customer_rollup, None, customer_dict)
+    typeahead_put("customers", customer_dict)
+    await record_metrics_history([history_point(customer_dict)])
     
     if isinstance(customer_dict['created_at'], str):
         customer_dict['created_at'] = datetime.fromisoformat(customer_dict['created_at'])
@@ -526,28 +1515,106 @@ async def create_customer(customer_data: CustomerCreate, current_user: Dict = De
     
     return Customer(**customer_dict)
 
+# Keyset pagination helpers
+CUSTOMER_SORT_FIELDS = {"company_name", "arr", "health_score", "renewal_date", "created_at", "updated_at"}
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(value: Any, last_id: str) -> str:
+    raw = json.dumps([value, last_id], default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+def keyset_filter(field: str, direction: int, value: Any, last_id: str) -> Dict:
+    """Match documents strictly after (value, last_id) in (field, id) order.
+
+    Mongo sorts missing/null values before everything else, so nulls need
+    their own branch on either side of the boundary.
+    """
+    if direction == 1:
+        if value is None:
+            return {"$or": [{field: {"$ne": None}}, {field: None, "id": {"$gt": last_id}}]}
+        return {"$or": [{field: {"$gt": value}}, {field: value, "id": {"$gt": last_id}}]}
+    if value is None:
+        return {field: None, "id": {"$lt": last_id}}
+    return {"$or": [{field: {"$lt": value}}, {field: value, "id": {"$lt": last_id}}, {field: None}]}
+
+def build_customer_query(
+    region: Optional[str] = None,
+    health_status: Optional[str] = None,
+    account_status: Optional[str] = None,
+    csm_owner_id: Optional[str] = None,
+    renewal_from: Optional[str] = None,
+    renewal_to: Optional[str] = None,
+) -> Dict:
+    query = {}
+    if region:
+        query['region'] = region
+    if health_status:
+        query['health_status'] = health_status
+    if account_status:
+        query['account_status'] = account_status
+    if csm_owner_id:
+        query['csm_owner_id'] = csm_owner_id
+    if renewal_from or renewal_to:
+        # renewal_date is stored as an ISO date string, so lexical range works
+        renewal = {"$gt": ""}
+        if renewal_from:
+            renewal['$gte'] = renewal_from
+        if renewal_to:
+            renewal['$lte'] = renewal_to
+        query['renewal_date'] = renewal
+    return query
+
 @api_router.get("/customers", response_model=List[Customer])
-async def get_customers(current_user: Dict = Depends(get_current_user)):
-    customers = await db.customers.find({}, {"_id": 0}).to_list(1000)
-    for customer in customers:
-        if isinstance(customer['created_at'], str):
-            customer['created_at'] = datetime.fromisoformat(customer['created_at'])
-        if isinstance(customer['updated_at'], str):
-            customer['updated_at'] = datetime.fromisoformat(customer['updated_at'])
-    return customers
+async def get_customers(
+    request: Request,
+    region: Optional[str] = None,
+    health_status: Optional[str] = None,
+    account_status: Optional[str] = None,
+    csm_owner_id: Optional[str] = None,
+    renewal_from: Optional[str] = None,
+    renewal_to: Optional[str] = None,
+    sort_by: str = "company_name",
+    sort_order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    if sort_by not in CUSTOMER_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort_by}'")
+    direction = -1 if sort_order == "desc" else 1
+    
+    query = build_customer_query(region, health_status, account_status, csm_owner_id, renewal_from, renewal_to)
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        query = {"$and": [query, keyset_filter(sort_by, direction, value, last_id)]}
+    
+    # Fetch one extra row to know whether another page exists
+    customers = await db.customers.find(query, {"_id": 0}).sort(
+        [(sort_by, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    headers = {}
+    if len(customers) > limit:
+        customers = customers[:limit]
+        last = customers[-1]
+        headers['X-Next-Cursor'] = encode_cursor(last.get(sort_by), last['id'])
+    
+    return list_response(Customer, customers, headers, request)
 
 @api_router.get("/customers/{customer_id}", response_model=Customer)
-async def get_customer(customer_id: str, current_user: Dict = Depends(get_current_user)):
+async def get_customer(customer_id: str, request: Request, current_user: Dict = Depends(get_current_user)):
     customer = await db.customers.find_one({"id": customer_id}, {"_id": 0})
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    if isinstance(customer['created_at'], str):
-        customer['created_at'] = datetime.fromisoformat(customer['created_at'])
-    if isinstance(customer['updated_at'], str):
-        customer['updated_at'] = datetime.fromisoformat(customer['updated_at'])
-    
-    return Customer(**customer)
+    return model_response(Customer, customer, request)
 
 @api_router.put("/customers/{customer_id}", response_model=Customer)
 async def update_customer(customer_id: str, customer_data: CustomerCreate, current_user: Dict = Depends(get_current_user)):
@@ -558,13 +1625,13 @@ async def update_customer(customer_id: str, customer_data: CustomerCreate, curre
     # Get CSM/AM details
     csm_name = None
     if customer_data.csm_owner_id:
-        csm = await db.users.find_one({"id": customer_data.csm_owner_id}, {"_id": 0})
+        csm = await user_directory.get(customer_data.csm_owner_id)
         if csm:
             csm_name = csm['name']
     
     am_name = None
     if customer_data.am_owner_id:
-        am = await db.users.find_one({"id": customer_data.am_owner_id}, {"_id": 0})
+        am = await user_directory.get(customer_data.am_owner_id)
         if am:
             am_name = am['name']
     
@@ -572,12 +1639,18 @@ async def update_customer(customer_id: str, customer_data: CustomerCreate, curre
     update_dict['csm_owner_name'] = csm_name
     update_dict['am_owner_name'] = am_name
     update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
-    update_dict['health_score'] = calculate_health_score({**existing, **update_dict})
-    update_dict['health_status'] = determine_health_status(update_dict['health_score'])
+    if not existing.get('health_override'):
+        update_dict['health_score'] = calculate_health_score({**existing, **update_dict})
+        update_dict['health_status'] = determine_health_status(update_dict['health_score'])
+        update_dict['health_model_version'] = health_model.version
     
     await db.customers.update_one({"id": customer_id}, {"$set": update_dict})
     
     updated = await db.customers.find_one({"id": customer_id}, {"_id": 0})
+    await apply_rollup(customer_rollup, existing, updated)
+    typeahead_put("customers", updated)
+    if metrics_changed(existing, updated):
+        await record_metrics_history([history_point(updated)])
     if isinstance(updated['created_at'], str):
         updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     if isinstance(updated['updated_at'], str):
@@ -587,9 +1660,11 @@ async def update_customer(customer_id: str, customer_data: CustomerCreate, curre
 
 @api_router.delete("/customers/{customer_id}")
 async def delete_customer(customer_id: str, current_user: Dict = Depends(get_current_user)):
-    result = await db.customers.delete_one({"id": customer_id})
-    if result.deleted_count == 0:
+    deleted = await db.customers.find_one_and_delete({"id": customer_id}, {"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Customer not found")
+    await apply_rollup(customer_rollup, deleted, None)
+    typeahead_indexes["customers"].remove(customer_id)
     return {"message": "Customer deleted successfully"}
 
 # Health Status Update with optional risk creation
@@ -611,16 +1686,98 @@ async def update_customer_health(customer_id: str, health_update: HealthStatusUp
     
     new_health_score = health_score_map.get(health_update.health_status, existing.get('health_score', 50))
     
+    now = datetime.now(timezone.utc).isoformat()
     update_dict = {
         'health_status': health_update.health_status,
         'health_score': new_health_score,
-        'updated_at': datetime.now(timezone.utc).isoformat()
+        'health_override': True,
+        'health_override_by_id': current_user['user_id'],
+        'health_override_at': now,
+        'health_model_version': health_model.version,
+        'updated_at': now
     }
     
     await db.customers.update_one({"id": customer_id}, {"$set": update_dict})
+    await apply_rollup(customer_rollup, existing, {**existing, **update_dict})
+    if metrics_changed(existing, update_dict):
+        await record_metrics_history([history_point({**existing, **update_dict})])
     
     return {"message": "Health status updated", "health_status": health_update.health_status, "health_score": new_health_score}
 
+@api_router.delete("/customers/{customer_id}/health")
+async def clear_customer_health_override(customer_id: str, current_user: Dict = Depends(get_current_user)):
+    """Drop a manual override and return the customer to model scoring."""
+    existing = await db.customers.find_one({"id": customer_id}, {"_id": 0})
+    if not existing:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    if existing.get('account_status') == "Churn":
+        raise HTTPException(status_code=400, detail="Churned customers stay pinned at Critical")
+    
+    health_score = calculate_health_score(existing)
+    update_dict = {
+        'health_score': health_score,
+        'health_status': determine_health_status(health_score),
+        'health_override': False,
+        'health_model_version': health_model.version,
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }
+    await db.customers.update_one(
+        {"id": customer_id},
+        {"$set": update_dict, "$unset": {"health_override_by_id": "", "health_override_at": ""}}
+    )
+    await apply_rollup(customer_rollup, existing, {**existing, **update_dict})
+    if metrics_changed(existing, update_dict):
+        await record_metrics_history([history_point({**existing, **update_dict})])
+    
+    return {"message": "Health override cleared", "health_status": update_dict['health_status'], "health_score": health_score}
+
+@api_router.get("/customers/{customer_id}/history")
+async def get_customer_history(
+    customer_id: str,
+    resolution: str = Query("day", pattern="^(raw|day|week|month)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Dict = Depends(get_current_user)
+):
+    """Health score and ARR trend for one customer, oldest first."""
+    if not await db.customers.find_one({"id": customer_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Customer not found")
+    
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=HISTORY_DEFAULT_RANGE_DAYS)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    
+    if resolution == "raw":
+        points = await db.customer_metrics_history.find(
+            {"customer_id": customer_id, "ts": {"$gte": start, "$lte": end}},
+            {"_id": 0, "customer_id": 0}
+        ).sort("ts", 1).limit(limit).to_list(limit)
+        return {"customer_id": customer_id, "resolution": resolution, "points": points}
+    
+    rollups = await db.customer_metrics_rollups.find(
+        {
+            "customer_id": customer_id,
+            "resolution": resolution,
+            "period_start": {"$gte": history_period(start, resolution), "$lte": history_period(end, resolution)}
+        },
+        {"_id": 0, "customer_id": 0, "resolution": 0}
+    ).sort("period_start", 1).limit(limit).to_list(limit)
+    
+    points = []
+    for rollup in rollups:
+        samples = rollup.pop('samples', 0)
+        score_sum = rollup.pop('health_score_sum', 0)
+        points.append({
+            **rollup,
+            "samples": samples,
+            "health_score_avg": round(score_sum / samples, 2) if samples else None,
+        })
+    return {"customer_id": customer_id, "resolution": resolution, "points": points}
+
 # Bulk Upload Response Model
 class BulkUploadResult(BaseModel):
     success_count: int
@@ -628,83 +1785,297 @@ class BulkUploadResult(BaseModel):
     total_rows: int
     errors: List[Dict[str, Any]] = []
 
-@api_router.post("/customers/bulk-upload", response_model=BulkUploadResult)
-async def bulk_upload_customers(file: UploadFile = File(...), current_user: Dict = Depends(get_current_user)):
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are accepted")
-    
-    content = await file.read()
-    decoded = content.decode('utf-8')
-    reader = csv.DictReader(io.StringIO(decoded))
+BULK_UPLOAD_CHUNK_SIZE = int(os.environ.get('BULK_UPLOAD_CHUNK_SIZE', 1000))
+
+def customer_from_csv_row(row: Dict, csm: Optional[Dict]) -> Dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "company_name": row['company_name'],
+        "website": row.get('website', ''),
+        "industry": row.get('industry', ''),
+        "region": row.get('region', ''),
+        "plan_type": row.get('plan_type', 'License'),
+        "arr": float(row['arr']) if row.get('arr') else 0,
+        "renewal_date": row.get('renewal_date', ''),
+        "onboarding_status": "Not Started",
+        "health_score": 75,
+        "health_status": "Healthy",
+        "csm_owner_id": csm['id'] if csm else None,
+        "csm_owner_name": csm['name'] if csm else None,
+        "products_purchased": [],
+        "active_users": 0,
+        "total_licensed_users": 0,
+        "tags": [],
+        "stakeholders": [],
+        "created_at": now,
+        "updated_at": now
+    }
+
+async def insert_customer_chunk(chunk: List[tuple], errors: List[Dict]) -> int:
+    """Insert (row_num, customer) pairs unordered; returns the number inserted."""
+    if not chunk:
+        return 0
+    failed = set()
+    try:
+        await db.customers.insert_many([customer for _, customer in chunk], ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get('writeErrors', []):
+            failed.add(write_error['index'])
+            errors.append({"row": chunk[write_error['index']][0], "error": write_error.get('errmsg', 'Write failed')})
+    inserted = [customer for index, (_, customer) in enumerate(chunk) if index not in failed]
+    await record_metrics_history([history_point(customer) for customer in inserted])
+    typeahead_put_many("customers", inserted)
+    return len(inserted)
+
+async def read_csv_rows(binary_file) -> AsyncIterator[Dict]:
+    """Parse a CSV file in the threadpool, one chunk of rows per call, so reading a large
+    upload spooled to disk never blocks the event loop.
+
+    Lines are decoded one at a time, so a non-UTF-8 byte raises UnicodeDecodeError only after
+    every row before it has been yielded.
+    """
+    reader = csv.DictReader(line.decode('utf-8') for line in binary_file)
+    
+    def read_chunk():
+        rows = []
+        try:
+            rows.extend(islice(reader, BULK_UPLOAD_CHUNK_SIZE))
+        except UnicodeDecodeError as e:
+            return rows, e
+        return rows, None
+    
+    while True:
+        rows, error = await run_in_threadpool(read_chunk)
+        for row in rows:
+            yield row
+        if error:
+            raise error
+        if not rows:
+            return
+
+async def import_customer_rows(rows: AsyncIterator[Dict], skip_rows: int = 0, on_chunk=None,
+                               job_id: Optional[str] = None) -> BulkUploadResult:
+    """Import CSV rows in chunks.
+
+    Rows before `skip_rows` were committed by an earlier run and are skipped. After each
+    chunk is written, `on_chunk(rows, successes, errors)` is awaited with that chunk's counts.
+    Customers imported by a job are tagged with its `job_id`; when the job resumes, rows an
+    earlier run inserted but never committed count as successes rather than duplicates.
+    A row that is not valid UTF-8 ends the import with an error for that row; the rows before
+    it are kept.
+    """
+    # Look up existing company names and CSM emails once instead of per row
+    existing_names = set()
+    own_names = set()
+    async for doc in db.customers.find({}, {"_id": 0, "company_name": 1, "import_job_id": 1}):
+        if job_id and doc.get('import_job_id') == job_id:
+            own_names.add(doc.get('company_name'))
+        else:
+            existing_names.add(doc.get('company_name'))
+    csms_by_email = {}
+    for user in await user_directory.all():
+        csms_by_email[user['email']] = user
     
     success_count = 0
-    error_count = 0
     errors = []
     total_rows = 0
-    
-    for row_num, row in enumerate(reader, start=2):  # Start at 2 to account for header
-        total_rows += 1
+    chunk = []
+    chunk_rows = 0
+    chunk_recovered = 0
+    flushed_errors = 0
+    wrote_customers = False
+    
+    async def flush():
+        nonlocal success_count, chunk, chunk_rows, chunk_recovered, flushed_errors, wrote_customers
+        wrote_customers = wrote_customers or bool(chunk or chunk_recovered)
+        successes = await insert_customer_chunk(chunk, errors) + chunk_recovered
+        success_count += successes
+        if on_chunk and chunk_rows:
+            await on_chunk(chunk_rows, successes, errors[flushed_errors:])
+        chunk, chunk_rows, chunk_recovered, flushed_errors = [], 0, 0, len(errors)
+    
+    row_num = 1  # Rows are numbered from 2 to account for the header
+    try:
         try:
-            # Validate required field
-            if not row.get('company_name'):
-                errors.append({"row": row_num, "error": "Missing company_name"})
-                error_count += 1
-                continue
-            
-            # Check for existing customer
-            existing = await db.customers.find_one({"company_name": row['company_name']})
-            if existing:
-                errors.append({"row": row_num, "error": f"Customer '{row['company_name']}' already exists"})
-                error_count += 1
-                continue
-            
-            # Get CSM owner ID from email if provided
-            csm_owner_id = None
-            csm_owner_name = None
-            if row.get('csm_email'):
-                csm = await db.users.find_one({"email": row['csm_email']}, {"_id": 0})
-                if csm:
-                    csm_owner_id = csm['id']
-                    csm_owner_name = csm['name']
-            
-            # Create customer
-            customer_dict = {
-                "id": str(uuid.uuid4()),
-                "company_name": row['company_name'],
-                "website": row.get('website', ''),
-                "industry": row.get('industry', ''),
-                "region": row.get('region', ''),
-                "plan_type": row.get('plan_type', 'License'),
-                "arr": float(row['arr']) if row.get('arr') else 0,
-                "renewal_date": row.get('renewal_date', ''),
-                "onboarding_status": "Not Started",
-                "health_score": 75,
-                "health_status": "Healthy",
-                "csm_owner_id": csm_owner_id,
-                "csm_owner_name": csm_owner_name,
-                "products_purchased": [],
-                "active_users": 0,
-                "total_licensed_users": 0,
-                "tags": [],
-                "stakeholders": [],
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }
-            
-            await db.customers.insert_one(customer_dict)
-            success_count += 1
-            
-        except Exception as e:
-            errors.append({"row": row_num, "error": str(e)})
-            error_count += 1
+            async for row in rows:
+                row_num += 1
+                if row_num - 2 < skip_rows:
+                    continue
+                if chunk_rows >= BULK_UPLOAD_CHUNK_SIZE:
+                    await flush()
+                total_rows += 1
+                chunk_rows += 1
+                try:
+                    # Validate required field
+                    if not row.get('company_name'):
+                        errors.append({"row": row_num, "error": "Missing company_name"})
+                        continue
+                    
+                    # Check for existing customer, including earlier rows of this file
+                    if row['company_name'] in existing_names:
+                        errors.append({"row": row_num, "error": f"Customer '{row['company_name']}' already exists"})
+                        continue
+                    
+                    existing_names.add(row['company_name'])
+                    if row['company_name'] in own_names:
+                        # Inserted by an earlier run of this job that died before committing the chunk
+                        own_names.discard(row['company_name'])
+                        chunk_recovered += 1
+                        continue
+                    
+                    customer = customer_from_csv_row(row, csms_by_email.get(row.get('csm_email')))
+                    if job_id:
+                        customer['import_job_id'] = job_id
+                    chunk.append((row_num, customer))
+                except Exception as e:
+                    errors.append({"row": row_num, "error": str(e)})
+        except UnicodeDecodeError:
+            # Earlier chunks may already be written, so report them rather than failing the upload
+            row_num += 1
+            total_rows += 1
+            chunk_rows += 1
+            errors.append({"row": row_num, "error": "Row is not UTF-8 encoded; it and the rows after it were not imported"})
+        
+        await flush()
+    finally:
+        # Also when the import fails part-way: the chunks written so far are in the collection
+        if wrote_customers:
+            await invalidate_rollups()
+    errors.sort(key=lambda error: error['row'])
     
     return BulkUploadResult(
         success_count=success_count,
-        error_count=error_count,
+        error_count=len(errors),
         total_rows=total_rows,
         errors=errors
     )
 
+# Bulk upload background jobs
+# Uploads are stored in GridFS and progress in the `jobs` collection, so a job whose
+# worker died is picked up again (by any worker) from its last committed chunk.
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 120))
+JOB_HEARTBEAT_SECONDS = max(1, JOB_STALE_SECONDS // 4)
+JOB_ERROR_LIMIT = 1000
+uploads_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="uploads")
+running_jobs = set()
+
+async def claim_job(job_id: str) -> Optional[Dict]:
+    now = datetime.now(timezone.utc)
+    stale = (now - timedelta(seconds=JOB_STALE_SECONDS)).isoformat()
+    return await db.jobs.find_one_and_update(
+        {"id": job_id, "$or": [
+            {"status": "queued"},
+            {"status": "running", "heartbeat_at": {"$lt": stale}}
+        ]},
+        {"$set": {"status": "running", "heartbeat_at": now.isoformat(), "updated_at": now.isoformat()}},
+        projection={"_id": 0}
+    )
+
+async def run_bulk_upload_job(job_id: str):
+    job = await claim_job(job_id)
+    if not job:
+        return
+    
+    async def commit_chunk(rows: int, successes: int, errors: List[Dict]):
+        now = datetime.now(timezone.utc).isoformat()
+        await db.jobs.update_one({"id": job_id}, {
+            "$inc": {"rows_processed": rows, "success_count": successes, "error_count": len(errors)},
+            "$push": {"errors": {"$each": errors, "$slice": JOB_ERROR_LIMIT}},
+            "$set": {"heartbeat_at": now, "updated_at": now}
+        })
+    
+    async def heartbeat():
+        # Independent of chunk commits, so a slow prefetch or chunk never looks like a dead worker
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await db.jobs.update_one({"id": job_id, "status": "running"}, {"$set": {
+                    "heartbeat_at": datetime.now(timezone.utc).isoformat()
+                }})
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+    
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        # Spool the stored upload to a local temp file so rows can be streamed through csv
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+            grid_out = await uploads_bucket.open_download_stream(job['file_id'])
+            while True:
+                data = await grid_out.readchunk()
+                if not data:
+                    break
+                spool.write(data)
+            spool.seek(0)
+            await import_customer_rows(
+                read_csv_rows(spool), skip_rows=job.get('rows_processed', 0), on_chunk=commit_chunk, job_id=job_id
+            )
+        
+        await db.jobs.update_one({"id": job_id}, {"$set": {
+            "status": "completed",
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }})
+        await uploads_bucket.delete(job['file_id'])
+    except Exception as e:
+        logger.error(f"Bulk upload job {job_id} failed: {e}")
+        await db.jobs.update_one({"id": job_id}, {"$set": {
+            "status": "failed",
+            "error": str(e),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }})
+    finally:
+        heartbeat_task.cancel()
+
+def start_job(job_id: str):
+    task = asyncio.create_task(run_bulk_upload_job(job_id))
+    running_jobs.add(task)
+    task.add_done_callback(running_jobs.discard)
+
+async def resume_jobs():
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)).isoformat()
+    async for job in db.jobs.find({"$or": [
+        {"status": "queued"},
+        {"status": "running", "heartbeat_at": {"$lt": stale}}
+    ]}, {"_id": 0, "id": 1}):
+        start_job(job['id'])
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: Dict = Depends(get_current_user)):
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "file_id": 0})
+    # Import errors echo the uploaded rows, so only the uploader and admins may read them
+    if not job or (job.get('created_by_id') != current_user['user_id'] and current_user.get('role') != UserRole.ADMIN.value):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.post("/customers/bulk-upload", response_model=BulkUploadResult)
+async def bulk_upload_customers(file: UploadFile = File(...), async_mode: bool = False, current_user: Dict = Depends(get_current_user)):
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are accepted")
+    
+    if async_mode:
+        file_id = await uploads_bucket.upload_from_stream(file.filename, file.file)
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": "customer_bulk_upload",
+            "status": "queued",
+            "filename": file.filename,
+            "file_id": file_id,
+            "rows_processed": 0,
+            "success_count": 0,
+            "error_count": 0,
+            "errors": [],
+            "created_by_id": current_user['user_id'],
+            "created_at": now,
+            "updated_at": now
+        }
+        await db.jobs.insert_one(job)
+        start_job(job['id'])
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"job_id": job['id'], "status": "queued"})
+    
+    # Stream rows from the spooled upload rather than reading the whole file into memory
+    return await import_customer_rows(read_csv_rows(file.file))
+
 # Activity Routes
 @api_router.post("/activities", response_model=Activity)
 async def create_activity(activity_data: ActivityCreate, current_user: Dict = Depends(get_current_user)):
@@ -714,7 +2085,7 @@ async def create_activity(activity_data: ActivityCreate, current_user: Dict = De
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get CSM name
-    csm = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0})
+    csm = await user_directory.get(current_user['user_id'])
     
     activity = Activity(
         **activity_data.model_dump(),
@@ -743,18 +2114,13 @@ async def create_activity(activity_data: ActivityCreate, current_user: Dict = De
     return Activity(**activity_dict)
 
 @api_router.get("/activities", response_model=List[Activity])
-async def get_activities(customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def get_activities(request: Request, customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
     query = {}
     if customer_id:
         query['customer_id'] = customer_id
     
     activities = await db.activities.find(query, {"_id": 0}).sort("activity_date", -1).to_list(1000)
-    for activity in activities:
-        if isinstance(activity['activity_date'], str):
-            activity['activity_date'] = datetime.fromisoformat(activity['activity_date'])
-        if isinstance(activity['created_at'], str):
-            activity['created_at'] = datetime.fromisoformat(activity['created_at'])
-    return activities
+    return list_response(Activity, activities, request=request)
 
 @api_router.put("/activities/{activity_id}")
 async def update_activity(activity_id: str, activity_data: dict, current_user: Dict = Depends(get_current_user)):
@@ -777,7 +2143,7 @@ async def create_risk(risk_data: RiskCreate, current_user: Dict = Depends(get_cu
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get assigned user name
-    assigned_user = await db.users.find_one({"id": risk_data.assigned_to_id}, {"_id": 0})
+    assigned_user = await user_directory.get(risk_data.assigned_to_id)
     
     risk = Risk(
         **risk_data.model_dump(),
@@ -791,6 +2157,7 @@ async def create_risk(risk_data: RiskCreate, current_user: Dict = Depends(get_cu
     risk_dict['updated_at'] = risk_dict['updated_at'].isoformat()
     
     await db.risks.insert_one(risk_dict)
+    await apply_rollup(risk_rollup, None, risk_dict)
     
     if isinstance(risk_dict['created_at'], str):
         risk_dict['created_at'] = datetime.fromisoformat(risk_dict['created_at'])
@@ -800,18 +2167,13 @@ async def create_risk(risk_data: RiskCreate, current_user: Dict = Depends(get_cu
     return Risk(**risk_dict)
 
 @api_router.get("/risks", response_model=List[Risk])
-async def get_risks(customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def get_risks(request: Request, customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
     query = {}
     if customer_id:
         query['customer_id'] = customer_id
     
     risks = await db.risks.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for risk in risks:
-        if isinstance(risk['created_at'], str):
-            risk['created_at'] = datetime.fromisoformat(risk['created_at'])
-        if isinstance(risk['updated_at'], str):
-            risk['updated_at'] = datetime.fromisoformat(risk['updated_at'])
-    return risks
+    return list_response(Risk, risks, request=request)
 
 @api_router.put("/risks/{risk_id}", response_model=Risk)
 async def update_risk(risk_id: str, risk_data: RiskCreate, current_user: Dict = Depends(get_current_user)):
@@ -825,6 +2187,7 @@ async def update_risk(risk_id: str, risk_data: RiskCreate, current_user: Dict =
     await db.risks.update_one({"id": risk_id}, {"$set": update_dict})
     
     updated = await db.risks.find_one({"id": risk_id}, {"_id": 0})
+    await apply_rollup(risk_rollup, existing, updated)
     if isinstance(updated['created_at'], str):
         updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     if isinstance(updated['updated_at'], str):
@@ -841,7 +2204,7 @@ async def create_opportunity(opp_data: OpportunityCreate, current_user: Dict = D
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get owner name
-    owner = await db.users.find_one({"id": opp_data.owner_id}, {"_id": 0})
+    owner = await user_directory.get(opp_data.owner_id)
     
     opportunity = Opportunity(
         **opp_data.model_dump(),
@@ -854,6 +2217,7 @@ async def create_opportunity(opp_data: OpportunityCreate, current_user: Dict = D
     opp_dict['updated_at'] = opp_dict['updated_at'].isoformat()
     
     await db.opportunities.insert_one(opp_dict)
+    await apply_rollup(opportunity_rollup, None, opp_dict)
     
     if isinstance(opp_dict['created_at'], str):
         opp_dict['created_at'] = datetime.fromisoformat(opp_dict['created_at'])
@@ -863,18 +2227,13 @@ async def create_opportunity(opp_data: OpportunityCreate, current_user: Dict = D
     return Opportunity(**opp_dict)
 
 @api_router.get("/opportunities", response_model=List[Opportunity])
-async def get_opportunities(customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def get_opportunities(request: Request, customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
     query = {}
     if customer_id:
         query['customer_id'] = customer_id
     
     opportunities = await db.opportunities.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for opp in opportunities:
-        if isinstance(opp['created_at'], str):
-            opp['created_at'] = datetime.fromisoformat(opp['created_at'])
-        if isinstance(opp['updated_at'], str):
-            opp['updated_at'] = datetime.fromisoformat(opp['updated_at'])
-    return opportunities
+    return list_response(Opportunity, opportunities, request=request)
 
 @api_router.put("/opportunities/{opportunity_id}")
 async def update_opportunity(opportunity_id: str, opp_data: dict, current_user: Dict = Depends(get_current_user)):
@@ -886,6 +2245,7 @@ async def update_opportunity(opportunity_id: str, opp_data: dict, current_user:
     update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
     
     await db.opportunities.update_one({"id": opportunity_id}, {"$set": update_dict})
+    await apply_rollup(opportunity_rollup, existing, {**existing, **update_dict})
     return {"message": "Opportunity updated successfully"}
 
 @api_router.put("/risks/{risk_id}")
@@ -898,6 +2258,7 @@ async def update_risk(risk_id: str, risk_data: dict, current_user: Dict = Depend
     update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
     
     await db.risks.update_one({"id": risk_id}, {"$set": update_dict})
+    await apply_rollup(risk_rollup, existing, {**existing, **update_dict})
     return {"message": "Risk updated successfully"}
 
 # Stakeholder Routes
@@ -946,7 +2307,7 @@ async def add_document(customer_id: str, document: dict, current_user: Dict = De
     if not existing:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    user = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0})
+    user = await user_directory.get(current_user['user_id'])
     
     doc = {
         "id": str(uuid.uuid4()),
@@ -986,8 +2347,8 @@ async def create_task(task_data: TaskCreate, current_user: Dict = Depends(get_cu
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get assigned user name
-    assigned_user = await db.users.find_one({"id": task_data.assigned_to_id}, {"_id": 0})
-    created_by = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0})
+    assigned_user = await user_directory.get(task_data.assigned_to_id)
+    created_by = await user_directory.get(current_user['user_id'])
     
     task = Task(
         **task_data.model_dump(),
@@ -1002,6 +2363,7 @@ async def create_task(task_data: TaskCreate, current_user: Dict = Depends(get_cu
     task_dict['updated_at'] = task_dict['updated_at'].isoformat()
     
     await db.tasks.insert_one(task_dict)
+    await apply_rollup(task_rollup, None, task_dict)
     
     if isinstance(task_dict['created_at'], str):
         task_dict['created_at'] = datetime.fromisoformat(task_dict['created_at'])
@@ -1011,7 +2373,7 @@ async def create_task(task_data: TaskCreate, current_user: Dict = Depends(get_cu
     return Task(**task_dict)
 
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks(customer_id: Optional[str] = None, assigned_to_id: Optional[str] = None, status: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def get_tasks(request: Request, customer_id: Optional[str] = None, assigned_to_id: Optional[str] = None, status: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
     query = {}
     if customer_id:
         query['customer_id'] = customer_id
@@ -1021,12 +2383,7 @@ async def get_tasks(customer_id: Optional[str] = None, assigned_to_id: Optional[
         query['status'] = status
     
     tasks = await db.tasks.find(query, {"_id": 0}).sort("due_date", 1).to_list(1000)
-    for task in tasks:
-        if isinstance(task['created_at'], str):
-            task['created_at'] = datetime.fromisoformat(task['created_at'])
-        if isinstance(task['updated_at'], str):
-            task['updated_at'] = datetime.fromisoformat(task['updated_at'])
-    return tasks
+    return list_response(Task, tasks, request=request)
 
 @api_router.put("/tasks/{task_id}", response_model=Task)
 async def update_task(task_id: str, task_data: TaskCreate, current_user: Dict = Depends(get_current_user)):
@@ -1044,6 +2401,7 @@ async def update_task(task_id: str, task_data: TaskCreate, current_user: Dict =
     await db.tasks.update_one({"id": task_id}, {"$set": update_dict})
     
     updated = await db.tasks.find_one({"id": task_id}, {"_id": 0})
+    await apply_rollup(task_rollup, existing, updated)
     if isinstance(updated['created_at'], str):
         updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     if isinstance(updated['updated_at'], str):
@@ -1053,9 +2411,10 @@ async def update_task(task_id: str, task_data: TaskCreate, current_user: Dict =
 
 @api_router.delete("/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: Dict = Depends(get_current_user)):
-    result = await db.tasks.delete_one({"id": task_id})
-    if result.deleted_count == 0:
+    deleted = await db.tasks.find_one_and_delete({"id": task_id}, {"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
+    await apply_rollup(task_rollup, deleted, None)
     return {"message": "Task deleted successfully"}
 
 # Data Labs Reports Routes
@@ -1067,7 +2426,7 @@ async def create_datalabs_report(report_data: DataLabsReportCreate, current_user
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get created by user name
-    created_by = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0})
+    created_by = await user_directory.get(current_user['user_id'])
     
     report = DataLabsReport(
         **report_data.model_dump(),
@@ -1087,16 +2446,13 @@ async def create_datalabs_report(report_data: DataLabsReportCreate, current_user
     return DataLabsReport(**report_dict)
 
 @api_router.get("/datalabs-reports", response_model=List[DataLabsReport])
-async def get_datalabs_reports(customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
+async def get_datalabs_reports(request: Request, customer_id: Optional[str] = None, current_user: Dict = Depends(get_current_user)):
     query = {}
     if customer_id:
         query['customer_id'] = customer_id
     
     reports = await db.datalabs_reports.find(query, {"_id": 0}).sort("report_date", -1).to_list(1000)
-    for report in reports:
-        if isinstance(report['created_at'], str):
-            report['created_at'] = datetime.fromisoformat(report['created_at'])
-    return reports
+    return list_response(DataLabsReport, reports, request=request)
 
 # Invoice Models and Routes
 class Invoice(BaseModel):
@@ -1134,7 +2490,7 @@ async def create_invoice(customer_id: str, invoice_data: InvoiceCreate, current_
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get user details
-    user = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0})
+    user = await user_directory.get(current_user['user_id'])
     
     invoice = Invoice(
         customer_id=customer_id,
@@ -1147,44 +2503,119 @@ async def create_invoice(customer_id: str, invoice_data: InvoiceCreate, current_
     invoice_dict['created_at'] = invoice_dict['created_at'].isoformat()
     invoice_dict['updated_at'] = invoice_dict['updated_at'].isoformat()
     
-    await db.invoices.insert_one(invoice_dict)
-    
     # Auto-flag if invoice is overdue and unpaid
+    risk_dict = None
     if invoice_data.status == 'Overdue' or (invoice_data.due_date < datetime.now(timezone.utc).date().isoformat() and invoice_data.status not in ['Paid']):
         # Create commercial risk automatically
-        risk_dict = {
-            "id": str(uuid.uuid4()),
-            "customer_id": customer_id,
-            "customer_name": customer.get('company_name'),
-            "category": "Commercial",
-            "subcategory": "Payment Overdue",
-            "severity": "High",
-            "status": "Open",
-            "title": f"Overdue Invoice: {invoice_data.invoice_number}",
-            "description": f"Invoice {invoice_data.invoice_number} is overdue. Amount: ₹{invoice_data.invoice_amount - invoice_data.paid_amount}",
-            "revenue_impact": invoice_data.invoice_amount - invoice_data.paid_amount,
-            "identified_date": datetime.now(timezone.utc).date().isoformat(),
-            "assigned_to_id": current_user['user_id'],
-            "assigned_to_name": user.get('name') if user else None,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
+        risk_dict = overdue_invoice_risk(invoice_dict, customer, current_user['user_id'], user.get('name') if user else None)
+        # Tells the overdue sweeper this invoice already has its risk; the id is derived from
+        # the invoice, so a sweep that gets here first can't raise a second one
+        invoice_dict['overdue_risk_id'] = risk_dict['id']
+    
+    await db.invoices.insert_one(invoice_dict)
+    
+    if risk_dict:
         await db.risks.insert_one(risk_dict)
+        await apply_rollup(risk_rollup, None, risk_dict)
     
     return {"message": "Invoice created successfully", "id": invoice.id}
 
 @api_router.get("/customers/{customer_id}/invoices")
 async def get_customer_invoices(customer_id: str, current_user: Dict = Depends(get_current_user)):
-    invoices = await db.invoices.find({"customer_id": customer_id}, {"_id": 0}).sort("invoice_date", -1).to_list(100)
+    # Overdue status is maintained by sweep_overdue_invoices, so this is a pure read
+    return await db.invoices.find({"customer_id": customer_id}, {"_id": 0}).sort("invoice_date", -1).to_list(100)
+
+# Overdue invoice sweeper
+# Marking an invoice Overdue and raising its risk are separate steps, and either can be cut
+# short by a crash. Every sweep therefore re-selects Overdue invoices that still have no
+# overdue_risk_id, and each risk's id is derived from its invoice id, so re-inserting a risk
+# another run (or another worker) already wrote fails on the unique index instead of
+# duplicating it. Invoices due before the INVOICE_RISK_MAX_AGE_DAYS cutoff are marked
+# Overdue without a risk, so the first sweep doesn't raise one for every historical invoice.
+INVOICE_SWEEP_INTERVAL_SECONDS = int(os.environ.get('INVOICE_SWEEP_INTERVAL_SECONDS', 900))
+INVOICE_RISK_MAX_AGE_DAYS = int(os.environ.get('INVOICE_RISK_MAX_AGE_DAYS', 30))
+OVERDUE_RISK_NAMESPACE = uuid.UUID("6f1c7a52-3f0e-4c5e-9a43-2b7d51c0e8a4")
+
+def overdue_risk_id(invoice_id: str) -> str:
+    return str(uuid.uuid5(OVERDUE_RISK_NAMESPACE, invoice_id))
+
+def overdue_invoice_risk(invoice: Dict, customer: Optional[Dict], assigned_to_id: Optional[str], assigned_to_name: Optional[str]) -> Dict:
+    outstanding = invoice['invoice_amount'] - invoice.get('paid_amount', 0)
+    now = datetime.now(timezone.utc)
+    return {
+        "id": overdue_risk_id(invoice['id']),
+        "customer_id": invoice['customer_id'],
+        "customer_name": customer.get('company_name') if customer else None,
+        "category": "Commercial",
+        "subcategory": "Payment Overdue",
+        "severity": "High",
+        "status": "Open",
+        "title": f"Overdue Invoice: {invoice['invoice_number']}",
+        "description": f"Invoice {invoice['invoice_number']} is overdue. Amount: ₹{outstanding}",
+        "revenue_impact": outstanding,
+        "identified_date": now.date().isoformat(),
+        "assigned_to_id": assigned_to_id,
+        "assigned_to_name": assigned_to_name,
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat()
+    }
+
+async def mark_overdue_invoices(today: str) -> int:
+    result = await db.invoices.update_many(
+        {"due_date": {"$gt": "", "$lt": today}, "status": {"$nin": ["Paid", "Overdue"]}},
+        {"$set": {"status": "Overdue", "updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return result.modified_count
+
+async def raise_overdue_risks(cutoff: str) -> int:
+    """Raise the missing risk for each Overdue invoice due on or after `cutoff`; returns how many were new."""
+    invoices = await db.invoices.find(
+        {"status": "Overdue", "overdue_risk_id": None, "due_date": {"$gte": cutoff}}, {"_id": 0}
+    ).to_list(None)
+    if not invoices:
+        return 0
+    
+    customer_ids = list({invoice['customer_id'] for invoice in invoices})
+    customers = {
+        customer['id']: customer
+        for customer in await db.customers.find(
+            {"id": {"$in": customer_ids}}, {"_id": 0, "id": 1, "company_name": 1, "csm_owner_id": 1}
+        ).to_list(None)
+    }
     
-    # Update status to Overdue if past due date and not paid
-    today = datetime.now(timezone.utc).date().isoformat()
-    for inv in invoices:
-        if inv.get('due_date') and inv['due_date'] < today and inv.get('status') not in ['Paid', 'Overdue']:
-            inv['status'] = 'Overdue'
-            await db.invoices.update_one({"id": inv['id']}, {"$set": {"status": "Overdue"}})
+    risks = []
+    for invoice in invoices:
+        customer = customers.get(invoice['customer_id'])
+        assigned_to_id = invoice.get('created_by_id') or (customer or {}).get('csm_owner_id')
+        assignee = await user_directory.get(assigned_to_id)
+        risks.append(overdue_invoice_risk(invoice, customer, assigned_to_id, assignee.get('name') if assignee else None))
     
-    return invoices
+    raised = len(risks)
+    try:
+        await db.risks.insert_many(risks, ordered=False)
+    except BulkWriteError as e:
+        write_errors = e.details.get('writeErrors', [])
+        if any(error.get('code') != 11000 for error in write_errors):
+            raise
+        # Already written by an interrupted run or a concurrent sweep
+        raised -= len(write_errors)
+    
+    await db.invoices.bulk_write([
+        UpdateOne({"id": invoice['id'], "overdue_risk_id": None}, {"$set": {"overdue_risk_id": risk['id']}})
+        for invoice, risk in zip(invoices, risks)
+    ], ordered=False)
+    if raised:
+        await invalidate_rollups()
+    return raised
+
+async def sweep_overdue_invoices() -> Dict:
+    """Mark past-due unpaid invoices Overdue and raise a commercial risk for each recent one."""
+    now = datetime.now(timezone.utc)
+    marked = await mark_overdue_invoices(now.date().isoformat())
+    raised = await raise_overdue_risks((now - timedelta(days=INVOICE_RISK_MAX_AGE_DAYS)).date().isoformat())
+    if marked or raised:
+        logger.info(f"Overdue sweep marked {marked} invoices, raised {raised} risks")
+    return {"marked_overdue": marked, "risks_raised": raised}
 
 @api_router.put("/customers/{customer_id}/invoices/{invoice_id}")
 async def update_invoice(customer_id: str, invoice_id: str, invoice_data: dict, current_user: Dict = Depends(get_current_user)):
@@ -1252,7 +2683,7 @@ async def record_customer_churn(customer_id: str, churn_request: ChurnRequest, c
         raise HTTPException(status_code=404, detail="Customer not found")
     
     # Get user details
-    user = await db.users.find_one({"id": current_user['user_id']}, {"_id": 0})
+    user = await user_directory.get(current_user['user_id'])
     
     # Create churn record
     churn_data = churn_request.churn_data
@@ -1284,16 +2715,18 @@ async def record_customer_churn(customer_id: str, churn_request: ChurnRequest, c
     await db.churn_records.insert_one(churn_record)
     
     # Update customer status
-    await db.customers.update_one(
-        {"id": customer_id},
-        {"$set": {
-            "account_status": "Churn",
-            "health_status": "Critical",
-            "health_score": 0,
-            "churned_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
+    churn_update = {
+        "account_status": "Churn",
+        "health_status": "Critical",
+        "health_score": 0,
+        "churned_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.customers.update_one({"id": customer_id}, {"$set": churn_update})
+    await apply_rollup(customer_rollup, customer, {**customer, **churn_update})
+    if metrics_changed(customer, churn_update):
+        await record_metrics_history([history_point({**customer, **churn_update})])
+    invalidate_churn_summary()
     
     return {"message": "Churn recorded successfully", "churn_record_id": churn_record['id']}
 
@@ -1310,61 +2743,120 @@ async def get_customer_churn_record(customer_id: str, current_user: Dict = Depen
     return record
 
 # Churn Reports
+# The summary is one $facet aggregation, cached in process until the next recorded churn.
+# The TTL bounds staleness on other workers, which don't see that invalidation.
+CHURN_REPORT_CACHE_TTL_SECONDS = int(os.environ.get('CHURN_REPORT_CACHE_TTL_SECONDS', 60))
+CHURN_DATE = {"$ifNull": ["$effective_churn_date", "$churned_at"]}
+churn_summary_cache: Dict[str, Any] = {"data": None, "expires_at": 0.0}
+
+def invalidate_churn_summary():
+    churn_summary_cache['data'] = None
+
+def churn_group(key: Any, default: str) -> List[Dict]:
+    return [
+        {"$group": {"_id": {"$ifNull": [key, default]}, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ]
+
+def churn_period(period: Dict) -> List[Dict]:
+    return [
+        {"$project": {"period": period, "revenue_impact": 1}},
+        {"$match": {"period": {"$nin": [None, ""]}}},
+        {"$group": {"_id": "$period", "count": {"$sum": 1}, "revenue_lost": {"$sum": "$revenue_impact"}}},
+        {"$sort": {"_id": 1}}
+    ]
+
+async def compute_churn_summary() -> Dict:
+    facets = await run_facets("churn_records", {
+        "totals": [{"$group": {"_id": None, "count": {"$sum": 1}, "revenue": {"$sum": "$revenue_impact"}}}],
+        "by_reason": churn_group("$primary_reason", "Unknown"),
+        "by_csm": churn_group("$csm_owner", "Unassigned"),
+        "by_type": churn_group("$churn_type", "Unknown"),
+        "by_month": churn_period({"$substr": [CHURN_DATE, 0, 7]}),
+    })
+    
+    # Quarters fold from the (at most a few dozen) month buckets
+    by_quarter: Dict[str, Dict] = {}
+    for row in facets['by_month']:
+        try:
+            quarter = f"{row['_id'][:4]}-Q{(int(row['_id'][5:7]) - 1) // 3 + 1}"
+        except ValueError:
+            continue
+        bucket = by_quarter.setdefault(quarter, {"quarter": quarter, "count": 0, "revenue_lost": 0})
+        bucket['count'] += row['count']
+        bucket['revenue_lost'] += row['revenue_lost']
+    
+    return {
+        "total_churns": facet_value(facets['totals'], "count"),
+        "total_revenue_lost": facet_value(facets['totals'], "revenue"),
+        "by_reason": [{"reason": row['_id'], "count": row['count']} for row in facets['by_reason']],
+        "by_csm": [{"csm": row['_id'], "count": row['count']} for row in facets['by_csm']],
+        "by_type": [{"type": row['_id'], "count": row['count']} for row in facets['by_type']],
+        "by_month": [{"month": row['_id'], "count": row['count'], "revenue_lost": row['revenue_lost']} for row in facets['by_month']],
+        "by_quarter": list(by_quarter.values()),
+    }
+
+async def get_churn_summary() -> Dict:
+    if churn_summary_cache['data'] is None or churn_summary_cache['expires_at'] < time.monotonic():
+        churn_summary_cache['data'] = await compute_churn_summary()
+        churn_summary_cache['expires_at'] = time.monotonic() + CHURN_REPORT_CACHE_TTL_SECONDS
+    return churn_summary_cache['data']
+
 @api_router.get("/reports/churn")
-async def get_churn_reports(current_user: Dict = Depends(get_current_user)):
-    # Get all churn records
-    records = await db.churn_records.find({}, {"_id": 0}).to_list(1000)
-    
-    # Aggregate by reason
-    by_reason = {}
-    by_csm = {}
-    by_type = {}
-    total_revenue_lost = 0
-    
-    for record in records:
-        reason = record.get('primary_reason', 'Unknown')
-        csm = record.get('csm_owner', 'Unassigned')
-        churn_type = record.get('churn_type', 'Unknown')
-        revenue = record.get('revenue_impact', 0)
+async def get_churn_reports(
+    request: Request,
+    include_records: bool = True,
+    records_limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    records_cursor: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    report = dict(await get_churn_summary())
+    
+    if include_records:
+        # Newest first, paged by (churned_at, id)
+        query = {}
+        if records_cursor:
+            value, last_id = decode_cursor(records_cursor)
+            query = keyset_filter("churned_at", -1, value, last_id)
+        records = await db.churn_records.find(query, {"_id": 0}).sort(
+            [("churned_at", -1), ("id", -1)]
+        ).limit(records_limit + 1).to_list(records_limit + 1)
         
-        by_reason[reason] = by_reason.get(reason, 0) + 1
-        by_csm[csm] = by_csm.get(csm, 0) + 1
-        by_type[churn_type] = by_type.get(churn_type, 0) + 1
-        total_revenue_lost += revenue
+        report['records_next_cursor'] = None
+        if len(records) > records_limit:
+            records = records[:records_limit]
+            report['records_next_cursor'] = encode_cursor(records[-1].get('churned_at'), records[-1]['id'])
+        report['records'] = records
     
+    return conditional_json(report, request)
+
+# Customer Setup & Configuration
+def default_customer_setup(customer_id: str, customer: Optional[Dict]) -> Dict:
     return {
-        "total_churns": len(records),
-        "total_revenue_lost": total_revenue_lost,
-        "by_reason": [{"reason": k, "count": v} for k, v in by_reason.items()],
-        "by_csm": [{"csm": k, "count": v} for k, v in by_csm.items()],
-        "by_type": [{"type": k, "count": v} for k, v in by_type.items()],
-        "records": records
+        "customer_id": customer_id,
+        "client_name": customer.get('company_name') if customer else '',
+        "domain_link": "",
+        "process_name": "",
+        "integration_done_by": "",
+        "onboarding_done_by": "",
+        "delivery_spoc": "",
+        "telephony_name": "",
+        "integration_type": "API",
+        "call_flow_type": "Inbound",
+        "audits_based_on": "Percentage",
+        "crm_integration": False,
+        "crm_name": "",
+        "languages_supported": ["English"],
+        "ai_features": {}
     }
 
-# Customer Setup & Configuration
 @api_router.get("/customers/{customer_id}/setup")
 async def get_customer_setup(customer_id: str, current_user: Dict = Depends(get_current_user)):
     setup = await db.customer_setup.find_one({"customer_id": customer_id}, {"_id": 0})
     if not setup:
         # Return default setup if not found
         customer = await db.customers.find_one({"id": customer_id}, {"_id": 0})
-        return {
-            "customer_id": customer_id,
-            "client_name": customer.get('company_name') if customer else '',
-            "domain_link": "",
-            "process_name": "",
-            "integration_done_by": "",
-            "onboarding_done_by": "",
-            "delivery_spoc": "",
-            "telephony_name": "",
-            "integration_type": "API",
-            "call_flow_type": "Inbound",
-            "audits_based_on": "Percentage",
-            "crm_integration": False,
-            "crm_name": "",
-            "languages_supported": ["English"],
-            "ai_features": {}
-        }
+        return default_customer_setup(customer_id, customer)
     return setup
 
 @api_router.put("/customers/{customer_id}/setup")
@@ -1381,48 +2873,766 @@ async def update_customer_setup(customer_id: str, setup_data: dict, current_user
     
     return {"message": "Setup updated successfully"}
 
+# Customer 360 overview
+# Everything CustomerDetail needs in one request: each section is its own query, run concurrently.
+OVERVIEW_LIST_SECTIONS = {
+    "activities": ("activities", [("activity_date", -1)]),
+    "risks": ("risks", [("created_at", -1)]),
+    "opportunities": ("opportunities", [("created_at", -1)]),
+    "tasks": ("tasks", [("due_date", 1)]),
+    "datalabs_reports": ("datalabs_reports", [("report_date", -1)]),
+    "documents": ("documents", [("created_at", -1)]),
+    "invoices": ("invoices", [("invoice_date", -1)]),
+}
+OVERVIEW_SECTIONS = ["customer", *OVERVIEW_LIST_SECTIONS, "setup", "churn_record"]
+# Sections are serialized through the same models as their own endpoints; setup has no model
+OVERVIEW_MODELS = {
+    "customer": Customer,
+    "activities": Activity,
+    "risks": Risk,
+    "opportunities": Opportunity,
+    "tasks": Task,
+    "datalabs_reports": DataLabsReport,
+    "documents": Document,
+    "invoices": Invoice,
+    "churn_record": ChurnRecord,
+}
+# Documents and churn records are written from free-form dicts, so stored ones can miss fields
+# their models require. Like their own endpoints, the overview returns them as stored; masks on
+# them are still checked against the model fields.
+OVERVIEW_RAW_SECTIONS = {"documents", "churn_record"}
+# Setup documents are free-form, so masks on them are only checked to be plain field names
+OVERVIEW_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+@lru_cache(maxsize=None)
+def partial_model(model: type) -> type:
+    """`model` with every required field made optional, for documents read through a field mask."""
+    fields = {}
+    for name, field in model.model_fields.items():
+        if field.is_required():
+            default = None
+        elif field.default_factory:
+            default = Field(default_factory=field.default_factory)
+        else:
+            default = field.default
+        fields[name] = (Optional[field.annotation], default)
+    return create_model(f"Partial{model.__name__}", __config__=ConfigDict(extra="ignore"), **fields)
+
+def serialize_overview_section(section: str, value: Any, mask: Optional[set]) -> Any:
+    model = OVERVIEW_MODELS.get(section)
+    if model is None or value is None or section in OVERVIEW_RAW_SECTIONS:
+        return value
+    if mask:
+        model = partial_model(model)
+        if isinstance(value, list):
+            return [model.model_validate(item).model_dump(mode="json", include=mask) for item in value]
+        return model.model_validate(value).model_dump(mode="json", include=mask)
+    if isinstance(value, list):
+        adapter = list_adapter(model)
+        return adapter.dump_python(adapter.validate_python(value), mode="json")
+    return model.model_validate(value).model_dump(mode="json")
+
+def parse_csv_param(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+@api_router.get("/customers/{customer_id}/overview")
+async def get_customer_overview(
+    customer_id: str,
+    request: Request,
+    sections: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    limits: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """
+    sections: comma-separated subset of OVERVIEW_SECTIONS (default: all).
+    limit / limits: default row cap per list section, overridden per section as "activities:20,tasks:5".
+    fields: field mask as "section.field" entries, e.g. "customer.company_name,activities.title".
+    """
+    requested = parse_csv_param(sections) or OVERVIEW_SECTIONS
+    unknown = set(requested) - set(OVERVIEW_SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(sorted(unknown))}")
+    
+    section_limits = {}
+    for entry in parse_csv_param(limits):
+        section, _, value = entry.partition(':')
+        if section not in OVERVIEW_LIST_SECTIONS or not value.isdigit():
+            raise HTTPException(status_code=400, detail=f"Invalid limit '{entry}'")
+        section_limits[section] = min(int(value), MAX_PAGE_SIZE)
+    
+    projections = {section: {"_id": 0} for section in OVERVIEW_SECTIONS}
+    for entry in parse_csv_param(fields):
+        section, _, field = entry.partition('.')
+        model = OVERVIEW_MODELS.get(section)
+        valid = field in model.model_fields if model else OVERVIEW_FIELD_NAME.match(field)
+        if section not in projections or not valid:
+            raise HTTPException(status_code=400, detail=f"Invalid field '{entry}'")
+        projections[section][field] = 1
+    # Masked reads keep `id`; for the customer it also keeps an existing document from reading as {}
+    for section in ["customer", "churn_record", *OVERVIEW_LIST_SECTIONS]:
+        if len(projections[section]) > 1:
+            projections[section]['id'] = 1
+    
+    # The customer document is always read: it decides the 404
+    queries = {"customer": db.customers.find_one({"id": customer_id}, projections['customer'])}
+    for section in requested:
+        if section in OVERVIEW_LIST_SECTIONS:
+            collection, sort = OVERVIEW_LIST_SECTIONS[section]
+            section_limit = section_limits.get(section, limit)
+            queries[section] = db[collection].find(
+                {"customer_id": customer_id}, projections[section]
+            ).sort(sort).limit(section_limit).to_list(section_limit)
+        elif section == "setup":
+            queries[section] = db.customer_setup.find_one({"customer_id": customer_id}, projections['setup'])
+        elif section == "churn_record":
+            queries[section] = db.churn_records.find_one({"customer_id": customer_id}, projections['churn_record'])
+    
+    results = dict(zip(queries, await asyncio.gather(*queries.values())))
+    if not results['customer']:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    
+    if "setup" in results and not results['setup']:
+        results['setup'] = default_customer_setup(customer_id, results['customer'])
+    if "customer" not in requested:
+        del results['customer']
+    for section, value in results.items():
+        mask = set(projections[section]) - {"_id"}
+        results[section] = serialize_overview_section(section, value, mask)
+    return conditional_json(results, request)
+
+# Global search
+# Every searchable collection has one "search_text" text index (see INDEXES). A search runs
+# the $text query on each requested collection concurrently, each ranked by textScore and
+# capped at `limit`, and returns the groups ordered by their best match.
+SEARCH_PROJECTIONS = {
+    "customers": ["id", "company_name", "region", "health_status", "arr", "csm_owner_name"],
+    "activities": ["id", "customer_id", "customer_name", "title", "activity_type", "activity_date"],
+    "risks": ["id", "customer_id", "customer_name", "title", "severity", "status"],
+    "tasks": ["id", "customer_id", "customer_name", "title", "status", "due_date", "assigned_to_name"],
+    "documents": ["id", "customer_id", "title", "file_name", "document_type"],
+}
+
+async def search_collection(collection: str, text: str, limit: int) -> List[Dict]:
+    projection = {"_id": 0, **{field: 1 for field in SEARCH_PROJECTIONS[collection]}, "score": {"$meta": "textScore"}}
+    return await db[collection].find({"$text": {"$search": text}}, projection).sort(
+        [("score", {"$meta": "textScore"})]
+    ).limit(limit).to_list(limit)
+
+@api_router.get("/search")
+async def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    types: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Dict = Depends(get_current_user)
+):
+    requested = parse_csv_param(types) or list(SEARCH_PROJECTIONS)
+    unknown = [collection for collection in requested if collection not in SEARCH_PROJECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+    
+    results = await asyncio.gather(*(search_collection(collection, q, limit) for collection in requested))
+    groups = [
+        {"type": collection, "results": rows}
+        for collection, rows in zip(requested, results) if rows
+    ]
+    groups.sort(key=lambda group: group['results'][0]['score'], reverse=True)
+    return {"query": q, "total": sum(len(group['results']) for group in groups), "groups": groups}
+
+# Streaming exports
+# Each export walks a Motor cursor in EXPORT_BATCH_SIZE batches and flushes ~64 KB chunks,
+# so memory stays flat regardless of how many rows are exported.
+EXPORT_BATCH_SIZE = 500
+EXPORT_FLUSH_BYTES = 64 * 1024
+EXPORT_FORMAT = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+
+def export_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return value
+
+async def stream_export(collection: str, query: Dict, sort: List[tuple], export_format: str, columns: List[str]):
+    cursor = db[collection].find(query, {"_id": 0}).sort(sort).batch_size(EXPORT_BATCH_SIZE)
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+    
+    async for doc in cursor:
+        if writer:
+            writer.writerow({column: export_cell(doc.get(column)) for column in columns})
+        else:
+            buffer.write(json.dumps(doc, default=str))
+            buffer.write("\n")
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_response(collection: str, query: Dict, sort: List[tuple], export_format: str, model) -> StreamingResponse:
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    extension = "csv" if export_format == "csv" else "ndjson"
+    return StreamingResponse(
+        stream_export(collection, query, sort, export_format, list(model.model_fields)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{extension}"'}
+    )
+
+@api_router.get("/export/customers")
+async def export_customers(
+    region: Optional[str] = None,
+    health_status: Optional[str] = None,
+    account_status: Optional[str] = None,
+    csm_owner_id: Optional[str] = None,
+    renewal_from: Optional[str] = None,
+    renewal_to: Optional[str] = None,
+    export_format: str = EXPORT_FORMAT,
+    current_user: Dict = Depends(get_current_user)
+):
+    query = build_customer_query(region, health_status, account_status, csm_owner_id, renewal_from, renewal_to)
+    return export_response("customers", query, [("company_name", 1), ("id", 1)], export_format, Customer)
+
+@api_router.get("/export/activities")
+async def export_activities(customer_id: Optional[str] = None, export_format: str = EXPORT_FORMAT, current_user: Dict = Depends(get_current_user)):
+    query = {"customer_id": customer_id} if customer_id else {}
+    return export_response("activities", query, [("activity_date", -1)], export_format, Activity)
+
+@api_router.get("/export/risks")
+async def export_risks(customer_id: Optional[str] = None, export_format: str = EXPORT_FORMAT, current_user: Dict = Depends(get_current_user)):
+    query = {"customer_id": customer_id} if customer_id else {}
+    return export_response("risks", query, [("created_at", -1)], export_format, Risk)
+
+@api_router.get("/export/tasks")
+async def export_tasks(customer_id: Optional[str] = None, assigned_to_id: Optional[str] = None, status: Optional[str] = None, export_format: str = EXPORT_FORMAT, current_user: Dict = Depends(get_current_user)):
+    query = {}
+    if customer_id:
+        query['customer_id'] = customer_id
+    if assigned_to_id:
+        query['assigned_to_id'] = assigned_to_id
+    if status:
+        query['status'] = status
+    return export_response("tasks", query, [("due_date", 1)], export_format, Task)
+
+@api_router.get("/export/invoices")
+async def export_invoices(customer_id: Optional[str] = None, status: Optional[str] = None, export_format: str = EXPORT_FORMAT, current_user: Dict = Depends(get_current_user)):
+    query = {}
+    if customer_id:
+        query['customer_id'] = customer_id
+    if status:
+        query['status'] = status
+    return export_response("invoices", query, [("invoice_date", -1)], export_format, Invoice)
+
 # Dashboard Stats
+def facet_count(match: Dict) -> List[Dict]:
+    return [{"$match": match}, {"$count": "n"}]
+
+def facet_value(facet: List[Dict], key: str = "n") -> Any:
+    return facet[0][key] if facet and facet[0].get(key) else 0
+
+async def run_facets(collection: str, facets: Dict[str, List[Dict]], match: Optional[Dict] = None) -> Dict:
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$facet": facets})
+    result = await db[collection].aggregate(pipeline).to_list(1)
+    return result[0] if result else {name: [] for name in facets}
+
+# Dashboard Rollups
+# A single materialized document in `dashboard_rollups`, kept current by $inc deltas from the
+# write handlers and rebuilt with $facet aggregations when missing, on a schedule, or on admin request.
+# Every delta also bumps `generation`; a rebuild only replaces the document if the generation it
+# read before aggregating is unchanged, so deltas landing mid-rebuild are never overwritten.
+ROLLUP_ID = "global"
+ROLLUP_REBUILD_INTERVAL_SECONDS = int(os.environ.get('ROLLUP_REBUILD_INTERVAL_SECONDS', 6 * 3600))
+ROLLUP_REBUILD_ATTEMPTS = 3
+
+def rollup_number(value: Any) -> float:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+def rollup_key(value: Any, default: str = "Unassigned") -> str:
+    # Keys become field paths in the rollup document
+    key = str(value) if value else default
+    return key.replace('.', '_').lstrip('$') or default
+
+def customer_rollup(doc: Optional[Dict]) -> Dict[str, float]:
+    if not doc:
+        return {}
+    arr = rollup_number(doc.get('arr'))
+    region = rollup_key(doc.get('region'))
+    return {
+        "total_customers": 1,
+        "total_arr": arr,
+        f"health_counts.{rollup_key(doc.get('health_status'), 'Unknown')}": 1,
+        f"arr_by_region.{region}": arr,
+        f"customers_by_region.{region}": 1,
+        f"customers_by_account_status.{rollup_key(doc.get('account_status'), 'Unknown')}": 1,
+    }
+
+def risk_rollup(doc: Optional[Dict]) -> Dict[str, float]:
+    if not doc:
+        return {}
+    return {
+        "open_risks": 1 if doc.get('status') == "Open" else 0,
+        "critical_risks": 1 if doc.get('severity') == "Critical" else 0,
+    }
+
+def opportunity_rollup(doc: Optional[Dict]) -> Dict[str, float]:
+    if not doc:
+        return {}
+    value = rollup_number(doc.get('value'))
+    stage = rollup_key(doc.get('stage'), 'Unknown')
+    active = doc.get('stage') != "Closed Won"
+    return {
+        "active_opportunities": 1 if active else 0,
+        "pipeline_value": value if active else 0,
+        f"pipeline_by_stage.{stage}.count": 1,
+        f"pipeline_by_stage.{stage}.value": value,
+    }
+
+def task_rollup(doc: Optional[Dict]) -> Dict[str, float]:
+    if not doc or doc.get('status') == "Completed":
+        return {}
+    return {f"open_tasks_by_user.{rollup_key(doc.get('assigned_to_id'))}": 1}
+
+async def apply_rollup(contribution, old: Optional[Dict], new: Optional[Dict]):
+    """Apply the difference between a document's old and new rollup contribution."""
+    before, after = contribution(old), contribution(new)
+    delta = {key: after.get(key, 0) - before.get(key, 0) for key in before.keys() | after.keys()}
+    delta = {key: value for key, value in delta.items() if value}
+    if delta:
+        # No upsert: a missing rollup is rebuilt from the collections on next read
+        await db.dashboard_rollups.update_one({"_id": ROLLUP_ID}, {"$inc": {**delta, "generation": 1}})
+
+async def invalidate_rollups():
+    await db.dashboard_rollups.delete_one({"_id": ROLLUP_ID})
+
+async def compute_rollups() -> Dict:
+    """Recompute the rollup from scratch: one $facet aggregation per collection, run concurrently."""
+    customers, risks, opportunities, tasks = await asyncio.gather(
+        run_facets("customers", {
+            "totals": [{"$group": {"_id": None, "count": {"$sum": 1}, "arr": {"$sum": "$arr"}}}],
+            "by_health": [{"$group": {"_id": "$health_status", "count": {"$sum": 1}}}],
+            "by_region": [{"$group": {"_id": "$region", "count": {"$sum": 1}, "arr": {"$sum": "$arr"}}}],
+            "by_account_status": [{"$group": {"_id": "$account_status", "count": {"$sum": 1}}}],
+        }),
+        run_facets("risks", {
+            "open": facet_count({"status": "Open"}),
+            "critical": facet_count({"severity": "Critical"}),
+        }),
+        run_facets("opportunities", {
+            "active": [
+                {"$match": {"stage": {"$ne": "Closed Won"}}},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "value": {"$sum": "$value"}}}
+            ],
+            "by_stage": [{"$group": {"_id": "$stage", "count": {"$sum": 1}, "value": {"$sum": "$value"}}}],
+        }),
+        run_facets("tasks", {
+            "by_user": [{"$group": {"_id": "$assigned_to_id", "count": {"$sum": 1}}}],
+        }, match={"status": {"$ne": "Completed"}}),
+    )
+    
+    def merge(rows: List[Dict], field: str = "count", default: str = "Unassigned") -> Dict:
+        merged = {}
+        for row in rows:
+            key = rollup_key(row['_id'], default)
+            merged[key] = merged.get(key, 0) + row[field]
+        return merged
+    
+    document = {
+        "total_customers": facet_value(customers['totals'], "count"),
+        "total_arr": facet_value(customers['totals'], "arr"),
+        "health_counts": merge(customers['by_health'], default="Unknown"),
+        "arr_by_region": merge(customers['by_region'], "arr"),
+        "customers_by_region": merge(customers['by_region']),
+        "customers_by_account_status": merge(customers['by_account_status'], default="Unknown"),
+        "open_risks": facet_value(risks['open']),
+        "critical_risks": facet_value(risks['critical']),
+        "active_opportunities": facet_value(opportunities['active'], "count"),
+        "pipeline_value": facet_value(opportunities['active'], "value"),
+        "pipeline_by_stage": {},
+        "open_tasks_by_user": merge(tasks['by_user']),
+        "built_at": datetime.now(timezone.utc).isoformat()
+    }
+    for row in opportunities['by_stage']:
+        stage = document['pipeline_by_stage'].setdefault(rollup_key(row['_id'], "Unknown"), {"count": 0, "value": 0})
+        stage['count'] += row['count']
+        stage['value'] += row['value']
+    return document
+
+async def rebuild_rollups_now() -> Dict:
+    for _ in range(ROLLUP_REBUILD_ATTEMPTS):
+        # A placeholder gives deltas made during the aggregation a document to land in
+        current = await db.dashboard_rollups.find_one_and_update(
+            {"_id": ROLLUP_ID}, {"$setOnInsert": {"generation": 0}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        generation = current.get('generation')
+        document = await compute_rollups()
+        document['generation'] = generation or 0
+        result = await db.dashboard_rollups.replace_one({"_id": ROLLUP_ID, "generation": generation}, document)
+        if result.matched_count:
+            return document
+    
+    logger.warning(f"Rollup rebuild raced with writes {ROLLUP_REBUILD_ATTEMPTS} times")
+    current = await db.dashboard_rollups.find_one({"_id": ROLLUP_ID})
+    if current and 'built_at' in current:
+        # The existing rollup is still maintained by deltas; the next scheduled rebuild retries
+        return current
+    # Only a placeholder exists; a slightly stale rollup beats none
+    await db.dashboard_rollups.replace_one({"_id": ROLLUP_ID}, document, upsert=True)
+    return document
+
+# In-flight rebuild shared by every caller in this worker, so readers that find no rollup
+# trigger one aggregation rather than one each
+rollup_rebuild: Optional[asyncio.Future] = None
+
+async def rebuild_rollups() -> Dict:
+    global rollup_rebuild
+    if rollup_rebuild is None or rollup_rebuild.done():
+        rollup_rebuild = asyncio.ensure_future(rebuild_rollups_now())
+    # Shielded so a cancelled request doesn't cancel the rebuild other callers are waiting on
+    return await asyncio.shield(rollup_rebuild)
+
+async def get_rollups() -> Dict:
+    rollup = await db.dashboard_rollups.find_one({"_id": ROLLUP_ID})
+    if not rollup or 'built_at' not in rollup:
+        rollup = await rebuild_rollups()
+    return rollup
+
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: Dict = Depends(get_current_user)):
-    total_customers = await db.customers.count_documents({})
-    total_arr = await db.customers.aggregate([
-        {"$group": {"_id": None, "total": {"$sum": "$arr"}}}
-    ]).to_list(1)
-    
-    healthy_count = await db.customers.count_documents({"health_status": "Healthy"})
-    at_risk_count = await db.customers.count_documents({"health_status": "At Risk"})
-    critical_count = await db.customers.count_documents({"health_status": "Critical"})
-    
-    open_risks = await db.risks.count_documents({"status": "Open"})
-    critical_risks = await db.risks.count_documents({"severity": "Critical"})
-    
-    active_opportunities = await db.opportunities.count_documents({"stage": {"$ne": "Closed Won"}})
-    pipeline_value = await db.opportunities.aggregate([
-        {"$match": {"stage": {"$ne": "Closed Won"}}},
-        {"$group": {"_id": None, "total": {"$sum": "$value"}}}
-    ]).to_list(1)
-    
-    # Task stats
-    my_tasks = await db.tasks.count_documents({"assigned_to_id": current_user['user_id'], "status": {"$ne": "Completed"}})
+async def get_dashboard_stats(request: Request, current_user: Dict = Depends(get_current_user)):
+    rollup = await get_rollups()
+    health = rollup.get('health_counts', {})
+    
+    # Overdue depends on today's date, so it cannot be maintained by write events;
+    # it is a bounded scan of the (assigned_to_id, status, due_date) index instead.
     overdue_tasks = await db.tasks.count_documents({
         "assigned_to_id": current_user['user_id'],
         "status": {"$ne": "Completed"},
         "due_date": {"$lt": datetime.now(timezone.utc).date().isoformat()}
     })
     
-    return {
-        "total_customers": total_customers,
-        "total_arr": total_arr[0]['total'] if total_arr and total_arr[0].get('total') else 0,
-        "healthy_customers": healthy_count,
-        "at_risk_customers": at_risk_count,
-        "critical_customers": critical_count,
-        "open_risks": open_risks,
-        "critical_risks": critical_risks,
-        "active_opportunities": active_opportunities,
-        "pipeline_value": pipeline_value[0]['total'] if pipeline_value and pipeline_value[0].get('total') else 0,
-        "my_tasks": my_tasks,
+    return conditional_json({
+        "total_customers": rollup.get('total_customers', 0),
+        "total_arr": rollup.get('total_arr', 0),
+        "healthy_customers": health.get("Healthy", 0),
+        "at_risk_customers": health.get("At Risk", 0),
+        "critical_customers": health.get("Critical", 0),
+        "open_risks": rollup.get('open_risks', 0),
+        "critical_risks": rollup.get('critical_risks', 0),
+        "active_opportunities": rollup.get('active_opportunities', 0),
+        "pipeline_value": rollup.get('pipeline_value', 0),
+        "my_tasks": rollup.get('open_tasks_by_user', {}).get(rollup_key(current_user['user_id']), 0),
         "overdue_tasks": overdue_tasks
+    }, request)
+
+@api_router.get("/dashboard/portfolio")
+async def get_portfolio_rollup(request: Request, current_user: Dict = Depends(get_current_user)):
+    rollup = await get_rollups()
+    return conditional_json({
+        "total_customers": rollup.get('total_customers', 0),
+        "total_arr": rollup.get('total_arr', 0),
+        "health_counts": rollup.get('health_counts', {}),
+        "arr_by_region": rollup.get('arr_by_region', {}),
+        "customers_by_region": rollup.get('customers_by_region', {}),
+        "customers_by_account_status": rollup.get('customers_by_account_status', {}),
+        "pipeline_by_stage": rollup.get('pipeline_by_stage', {}),
+        "built_at": rollup.get('built_at')
+    }, request)
+
+@api_router.post("/admin/health/recompute")
+async def recompute_customer_health(only_stale: bool = False, current_user: Dict = Depends(require_admin)):
+    return await recompute_health_scores(only_stale)
+
+# Server-sent events
+# GET /events replaces polling for dashboard stats, tasks and customers. Each worker runs one
+# change-stream consumer over those collections and fans events out to per-connection queues:
+# task and customer events go to every subscriber, since every user can list all of them,
+# and rollup changes become per-user stats deltas, coalesced over EVENTS_MAX_WAIT_MS.
+# EventSource can't send headers, so the client first trades its bearer token for a short-lived
+# ticket (POST /events/ticket) and passes that as the `ticket` query parameter. Only the ticket
+# ends up in URLs and access logs, and it is good for nothing but opening the stream.
+EVENT_HEARTBEAT_SECONDS = int(os.environ.get('EVENT_HEARTBEAT_SECONDS', 15))
+EVENTS_TICKET_SECONDS = int(os.environ.get('EVENTS_TICKET_SECONDS', 60))
+EVENTS_TICKET_PURPOSE = "events"
+EVENTS_MAX_WAIT_MS = int(os.environ.get('EVENTS_MAX_WAIT_MS', 1000))
+EVENTS_RETRY_SECONDS = int(os.environ.get('EVENTS_RETRY_SECONDS', 30))
+EVENT_QUEUE_SIZE = 256
+# Collection -> event name
+EVENT_COLLECTIONS = {"tasks": "task", "customers": "customer"}
+# Rollup fields as they appear in /dashboard/stats
+EVENT_STAT_FIELDS = {
+    "total_customers": "total_customers",
+    "total_arr": "total_arr",
+    "health_counts.Healthy": "healthy_customers",
+    "health_counts.At Risk": "at_risk_customers",
+    "health_counts.Critical": "critical_customers",
+    "open_risks": "open_risks",
+    "critical_risks": "critical_risks",
+    "active_opportunities": "active_opportunities",
+    "pipeline_value": "pipeline_value",
+}
+
+async def enable_change_stream_pre_images():
+    # Lets delete events carry the deleted document (MongoDB 6.0+), so clients learn its id
+    for collection in EVENT_COLLECTIONS:
+        try:
+            await db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+        except OperationFailure as e:
+            logger.info(f"Change stream pre-images unavailable for {collection}: {e}")
+
+class EventSubscriber:
+    def __init__(self, user: Dict):
+        self.user_id = user['user_id']
+        self.queue: asyncio.Queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: str, data: Dict):
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # A stalled client gets one "resync" instead of an unbounded backlog
+            self.overflowed = True
+
+class EventHub:
+    def __init__(self):
+        self.subscribers: set = set()
+        self.disabled = False
+        self.pre_images_enabled = False
+        self.pending_stats: Dict[str, Any] = {}
+
+    def publish_document(self, collection: str, operation: str, document: Optional[Dict], before: Optional[Dict]):
+        event = EVENT_COLLECTIONS[collection]
+        current = document or before
+        if not current:
+            # Delete without a pre-image: the id is unknown, so clients refetch
+            for subscriber in self.subscribers:
+                subscriber.offer("resync", {"scope": event})
+            return
+        data = {"op": operation, "id": current.get('id'), event: document}
+        for subscriber in self.subscribers:
+            subscriber.offer(event, data)
+
+    def flush_stats(self):
+        if not self.pending_stats:
+            return
+        shared = {EVENT_STAT_FIELDS[field]: value for field, value in self.pending_stats.items() if field in EVENT_STAT_FIELDS}
+        for subscriber in self.subscribers:
+            delta = dict(shared)
+            my_tasks = f"open_tasks_by_user.{rollup_key(subscriber.user_id)}"
+            if my_tasks in self.pending_stats:
+                delta['my_tasks'] = self.pending_stats[my_tasks]
+            if delta:
+                subscriber.offer("stats", delta)
+        self.pending_stats = {}
+
+    def publish_stats(self, operation: str, updated_fields: Optional[Dict]):
+        if operation == "update" and updated_fields:
+            self.pending_stats.update(updated_fields)
+        else:
+            # Rebuilt or invalidated: clients refetch /dashboard/stats
+            for subscriber in self.subscribers:
+                subscriber.offer("resync", {"scope": "stats"})
+
+    async def run(self):
+        """Consume the change stream until it closes; restarted by run_periodic after an error."""
+        if self.disabled:
+            return
+        if not self.pre_images_enabled:
+            await enable_change_stream_pre_images()
+            self.pre_images_enabled = True
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": [*EVENT_COLLECTIONS, "dashboard_rollups"]},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        try:
+            async with db.watch(
+                pipeline,
+                full_document="updateLookup",
+                full_document_before_change="whenAvailable",
+                max_await_time_ms=EVENTS_MAX_WAIT_MS
+            ) as stream:
+                while stream.alive:
+                    change = await stream.try_next()
+                    if change is None:
+                        self.flush_stats()
+                        continue
+                    if not self.subscribers:
+                        self.pending_stats = {}
+                        continue
+                    collection = change['ns']['coll']
+                    if collection == "dashboard_rollups":
+                        self.publish_stats(change['operationType'], change.get('updateDescription', {}).get('updatedFields'))
+                        continue
+                    document, before = change.get('fullDocument'), change.get('fullDocumentBeforeChange')
+                    for doc in (document, before):
+                        if doc:
+                            doc.pop('_id', None)
+                    self.publish_document(collection, change['operationType'], document, before)
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                self.disabled = True
+                logger.warning(f"Change streams unavailable, /api/events disabled: {e}")
+                return
+            raise
+
+event_hub = EventHub()
+
+def format_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def create_events_ticket(user: Dict, token: str) -> str:
+    payload = {
+        'user_id': user['user_id'],
+        'purpose': EVENTS_TICKET_PURPOSE,
+        # The login token it was issued for, so logging out also invalidates the ticket
+        'session': token_key(token),
+        'exp': datetime.now(timezone.utc) + timedelta(seconds=EVENTS_TICKET_SECONDS)
     }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def authenticate_events_ticket(ticket: str) -> Dict:
+    try:
+        payload = jwt.decode(ticket, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Ticket expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid ticket")
+    if payload.get('purpose') != EVENTS_TICKET_PURPOSE:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid ticket")
+    if payload.get('session') in revoked_tokens:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return payload
+
+@api_router.post("/events/ticket")
+async def issue_events_ticket(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    user = authenticate_token(credentials.credentials)
+    if not change_streams_available or event_hub.disabled:
+        raise HTTPException(status_code=503, detail="Live events unavailable")
+    return {"ticket": create_events_ticket(user, credentials.credentials), "expires_in": EVENTS_TICKET_SECONDS}
+
+@api_router.get("/events")
+async def stream_events(request: Request, ticket: str):
+    user = authenticate_events_ticket(ticket)
+    if not change_streams_available or event_hub.disabled:
+        raise HTTPException(status_code=503, detail="Live events unavailable")
+    
+    subscriber = EventSubscriber(user)
+    event_hub.subscribers.add(subscriber)
+    
+    async def events():
+        try:
+            yield format_event("ready", {"heartbeat_seconds": EVENT_HEARTBEAT_SECONDS})
+            while not await request.is_disconnected():
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    yield format_event("resync", {"scope": "all"})
+                    continue
+                try:
+                    event, data = await asyncio.wait_for(subscriber.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event, data)
+        finally:
+            event_hub.subscribers.discard(subscriber)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+# Admin: health scoring models
+async def activate_health_model(version: int):
+    await db.health_models.update_many({"active": True, "version": {"$ne": version}}, {"$set": {"active": False}})
+    await db.health_models.update_one({"version": version}, {"$set": {"active": True}})
+    await load_health_model()
+
+@api_router.get("/admin/health-models", response_model=List[HealthModelConfig])
+async def get_health_models(current_user: Dict = Depends(require_admin)):
+    return await db.health_models.find({}, {"_id": 0}).sort("version", -1).to_list(100)
+
+@api_router.post("/admin/health-models", response_model=HealthModelConfig)
+async def create_health_model(model_data: HealthModelCreate, current_user: Dict = Depends(require_admin)):
+    latest = await db.health_models.find_one({}, {"_id": 0, "version": 1}, sort=[("version", -1)])
+    config = HealthModelConfig(
+        **model_data.model_dump(exclude={"activate"}),
+        version=(latest['version'] if latest else DEFAULT_HEALTH_MODEL.version) + 1,
+        created_by_id=current_user['user_id']
+    )
+    
+    config_dict = config.model_dump()
+    config_dict['created_at'] = config_dict['created_at'].isoformat()
+    
+    try:
+        await db.health_models.insert_one(config_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Another model version was created concurrently, retry")
+    
+    if model_data.activate:
+        await activate_health_model(config.version)
+        config.active = True
+    return config
+
+@api_router.put("/admin/health-models/{version}/activate")
+async def activate_health_model_version(version: int, current_user: Dict = Depends(require_admin)):
+    if not await db.health_models.find_one({"version": version}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Health model not found")
+    await activate_health_model(version)
+    return {"message": "Health model activated", "version": version}
+
+@api_router.post("/admin/invoices/sweep-overdue")
+async def run_overdue_invoice_sweep(current_user: Dict = Depends(require_admin)):
+    return await sweep_overdue_invoices()
+
+@api_router.post("/admin/rollups/rebuild")
+async def rebuild_dashboard_rollups(current_user: Dict = Depends(require_admin)):
+    rollup = await rebuild_rollups()
+    return {"message": "Rollups rebuilt", "built_at": rollup['built_at']}
+
+# Admin: denormalized names
+@api_router.post("/admin/names/resync")
+async def resync_denormalized_names(current_user: Dict = Depends(require_admin)):
+    modified = await resync_names()
+    return {"message": "Names resynced", "modified": modified}
+
+# Admin: metrics
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: Dict = Depends(require_admin)):
+    return {**metrics.snapshot(), "token_cache_size": len(token_cache.entries), "revoked_tokens": len(revoked_tokens)}
+
+# Prometheus scrape endpoint; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    metrics.set("auth_token_cache_entries", len(token_cache.entries))
+    metrics.set("auth_revoked_tokens", len(revoked_tokens))
+    return Response(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+# Admin: index usage
+@api_router.get("/admin/indexes")
+async def get_index_stats(current_user: Dict = Depends(require_admin)):
+    report = {}
+    for collection in INDEXES:
+        stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        report[collection] = [
+            {
+                "name": stat['name'],
+                "key": stat['key'],
+                "ops": stat.get('accesses', {}).get('ops', 0),
+                "since": stat.get('accesses', {}).get('since'),
+            }
+            for stat in stats
+        ]
+    return report
 
 # Include router
 app.include_router(api_router)
@@ -1434,8 +3644,77 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Request profiling middleware
+# Every request feeds the per-route latency histogram. Requests sampled at PROFILE_SAMPLE_RATE
+# also count their Mongo commands (see CommandProfiler) and flag repeated single-collection
+# commands as likely N+1 patterns. Routes are labelled by path template to bound cardinality.
+def record_request_profile(method: str, route: str, profile: RequestProfile):
+    total = 0
+    for (command, collection), (count, seconds) in profile.commands.items():
+        total += count
+        labels = {"method": method, "route": route, "command": command, "collection": collection}
+        metrics.inc("mongo_commands_total", count, **labels)
+        metrics.inc("mongo_command_seconds_total", seconds, **labels)
+        # getMore just pages through one cursor, so repeats are expected
+        if count >= N_PLUS_ONE_THRESHOLD and command != "getMore":
+            metrics.inc("mongo_n_plus_one_total", **labels)
+            logger.warning(f"Possible N+1 in {method} {route}: {count} {command} commands on {collection}")
+    metrics.inc("profiled_requests_total", method=method, route=route)
+    metrics.histogram("mongo_commands_per_request", total, COUNT_BUCKETS, method=method, route=route)
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status_code = 500
+        profile = RequestProfile() if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE else None
+        token = request_profile.set(profile) if profile else None
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if token:
+                request_profile.reset(token)
+            # The router records the matched route in the shared scope
+            route = scope.get('route')
+            path = getattr(route, 'path', 'unmatched')
+            metrics.histogram("http_request_duration_seconds", time.perf_counter() - started,
+                              method=scope['method'], route=path, status=str(status_code))
+            if profile:
+                record_request_profile(scope['method'], path, profile)
+
+app.add_middleware(ProfilingMiddleware)
+
+# Response compression
+# Bodies of at least GZIP_MINIMUM_SIZE bytes are gzipped when the client accepts it. Starlette's
+# GZipMiddleware buffers small streamed chunks, so server-sent events bypass it.
+GZIP_MINIMUM_SIZE = int(os.environ.get('GZIP_MINIMUM_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+
+class CompressionMiddleware(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and b"text/event-stream" in dict(scope['headers']).get(b"accept", b""):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(CompressionMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -1443,6 +3722,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background jobs
+background_tasks: List[asyncio.Task] = []
+
+async def run_periodic(name: str, interval_seconds: int, job, run_now: bool = False):
+    if not run_now:
+        await asyncio.sleep(interval_seconds)
+    last_error = None
+    while True:
+        try:
+            await job()
+            last_error = None
+        except Exception as e:
+            # A job failing the same way on every run is logged once, until it recovers
+            if str(e) != last_error:
+                logger.error(f"Background job {name} failed: {e}")
+            last_error = str(e)
+        await asyncio.sleep(interval_seconds)
+
+def start_periodic(name: str, interval_seconds: int, job, run_now: bool = False):
+    if interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(run_periodic(name, interval_seconds, job, run_now)))
+
+@app.on_event("startup")
+async def startup_db_indexes():
+    await ensure_history_collection()
+    await ensure_indexes()
+
+@app.on_event("startup")
+async def startup_background_jobs():
+    await load_health_model()
+    start_periodic("health_model_poll", HEALTH_MODEL_POLL_SECONDS, load_health_model)
+    await load_revoked_tokens()
+    start_periodic("revocation_refresh", REVOCATION_REFRESH_SECONDS, load_revoked_tokens)
+    # Whole-collection jobs run on one worker per interval; on every worker they would repeat the
+    # work, and each health recompute would record the same history points again
+    start_periodic("rollup_rebuild", ROLLUP_REBUILD_INTERVAL_SECONDS,
+                   leased_job("rollup_rebuild", ROLLUP_REBUILD_INTERVAL_SECONDS, rebuild_rollups))
+    start_periodic("health_recompute", HEALTH_RECOMPUTE_INTERVAL_SECONDS,
+                   leased_job("health_recompute", HEALTH_RECOMPUTE_INTERVAL_SECONDS, recompute_health_scores))
+    await resume_jobs()
+    start_periodic("job_resume", JOB_STALE_SECONDS, resume_jobs)
+    start_periodic("overdue_invoice_sweep", INVOICE_SWEEP_INTERVAL_SECONDS, sweep_overdue_invoices, run_now=True)
+    await load_typeahead()
+    start_periodic("typeahead_reload", TYPEAHEAD_REFRESH_SECONDS, load_typeahead)
+    global change_streams_available
+    change_streams_available = await detect_change_streams()
+    if change_streams_available:
+        start_periodic("name_propagator", NAME_PROPAGATION_RETRY_SECONDS, run_name_propagator, run_now=True)
+        start_periodic("event_hub", EVENTS_RETRY_SECONDS, event_hub.run, run_now=True)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    if change_streams_available:
+        # Hand the propagator to another worker now rather than after the lease expires
+        try:
+            await release_lease("name_propagator")
+        except Exception as e:
+            logger.warning(f"Could not release the name propagator lease: {e}")
+    password_executor.shutdown(wait=False)
     client.close()
@@ -0,0 +1,85 @@
+import { useEffect, useRef } from 'react';
+import axios from 'axios';
+import { API } from '../App';
+
+const RECONNECT_DELAY_MS = 1000;
+const MAX_RECONNECT_DELAY_MS = 60000;
+
+// Subscribes to the /api/events stream while the component is mounted. `handlers` maps
+// event names (task, customer, stats) to callbacks. `onResync` runs when the stream
+// reconnects or the server asks for a refetch, since events may have been missed.
+// EventSource can't send an Authorization header, so each connection first fetches a
+// short-lived ticket; when the browser gives up on a stream (e.g. its ticket has expired)
+// a new ticket is fetched and the stream reopened. If the server has live events disabled
+// the ticket request fails and pages keep their initial load.
+export function useServerEvents(handlers, onResync) {
+  const handlersRef = useRef(handlers);
+  const resyncRef = useRef(onResync);
+  handlersRef.current = handlers;
+  resyncRef.current = onResync;
+
+  useEffect(() => {
+    if (!localStorage.getItem('token') || typeof EventSource === 'undefined') return undefined;
+
+    let source = null;
+    let retryTimer = null;
+    let retryDelay = RECONNECT_DELAY_MS;
+    let connected = false;
+    let closed = false;
+
+    const scheduleReconnect = () => {
+      if (closed) return;
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, MAX_RECONNECT_DELAY_MS);
+    };
+
+    async function connect() {
+      let ticket;
+      try {
+        const response = await axios.post(`${API}/events/ticket`);
+        ticket = response.data.ticket;
+      } catch (error) {
+        if (error.response?.status === 503 || error.response?.status === 401) return;
+        scheduleReconnect();
+        return;
+      }
+      if (closed) return;
+
+      source = new EventSource(`${API}/events?ticket=${encodeURIComponent(ticket)}`);
+      Object.keys(handlersRef.current).forEach((event) => {
+        source.addEventListener(event, (e) => handlersRef.current[event]?.(JSON.parse(e.data)));
+      });
+      source.addEventListener('ready', () => {
+        if (connected) resyncRef.current?.();
+        connected = true;
+        retryDelay = RECONNECT_DELAY_MS;
+      });
+      source.addEventListener('resync', () => resyncRef.current?.());
+      source.addEventListener('error', () => {
+        // The browser retries dropped connections by itself; once it gives up, get a new ticket
+        if (source.readyState === EventSource.CLOSED) scheduleReconnect();
+      });
+    }
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, []);
+}
+
+// Applies a task/customer event to a list of documents keyed by `id`
+export function applyDocumentEvent(items, event, kind) {
+  const document = event[kind];
+  if (event.op === 'delete' || !document) {
+    return items.filter((item) => item.id !== event.id);
+  }
+  const index = items.findIndex((item) => item.id === document.id);
+  if (index === -1) return [document, ...items];
+  const next = [...items];
+  next[index] = { ...items[index], ...document };
+  return next;
+}
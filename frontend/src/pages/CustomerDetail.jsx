@@ -65,25 +65,19 @@ export default function CustomerDetail() {
 
   const loadCustomerData = async () => {
     try {
-      const [customerRes, activitiesRes, risksRes, opportunitiesRes] = await Promise.all([
-        axios.get(`${API}/customers/${customerId}`),
-        axios.get(`${API}/activities?customer_id=${customerId}`),
-        axios.get(`${API}/risks?customer_id=${customerId}`),
-        axios.get(`${API}/opportunities?customer_id=${customerId}`)
-      ]);
-
-      setCustomer(customerRes.data);
-      setActivities(activitiesRes.data);
-      setRisks(risksRes.data);
-      setOpportunities(opportunitiesRes.data);
-      
-      // Load documents if available
-      try {
-        const docsRes = await axios.get(`${API}/customers/${customerId}/documents`);
-        setDocuments(docsRes.data);
-      } catch {
-        setDocuments([]);
-      }
+      const overviewRes = await axios.get(`${API}/customers/${customerId}/overview`, {
+        params: {
+          sections: 'customer,activities,risks,opportunities,documents',
+          limit: 1000,
+          limits: 'documents:100'
+        }
+      });
+
+      setCustomer(overviewRes.data.customer);
+      setActivities(overviewRes.data.activities);
+      setRisks(overviewRes.data.risks);
+      setOpportunities(overviewRes.data.opportunities);
+      setDocuments(overviewRes.data.documents || []);
     } catch (error) {
       toast.error('Failed to load customer data');
       navigate('/customers');
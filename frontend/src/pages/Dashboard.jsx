@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
 import { API } from '../App';
+import { useServerEvents, applyDocumentEvent } from '../hooks/use-server-events';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Badge } from '../components/ui/badge';
@@ -45,6 +46,12 @@ export default function Dashboard() {
     loadData();
   }, []);
 
+  useServerEvents({
+    stats: (delta) => setStats((prev) => (prev ? { ...prev, ...delta } : prev)),
+    task: (event) => setTasks((prev) => applyDocumentEvent(prev, event, 'task')),
+    customer: (event) => setCustomers((prev) => applyDocumentEvent(prev, event, 'customer'))
+  }, () => loadData());
+
   const loadData = async () => {
     try {
       const [statsRes, customersRes, tasksRes, activitiesRes, oppsRes] = await Promise.all([
@@ -1,6 +1,7 @@
 import { useState, useEffect, useMemo } from 'react';
 import axios from 'axios';
 import { API } from '../App';
+import { useServerEvents, applyDocumentEvent } from '../hooks/use-server-events';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Badge } from '../components/ui/badge';
@@ -214,6 +215,10 @@ export default function ExecutiveDashboard() {
     loadData();
   }, []);
 
+  useServerEvents({
+    customer: (event) => setCustomers((prev) => applyDocumentEvent(prev, event, 'customer'))
+  }, () => loadData());
+
   const loadData = async () => {
     try {
       const [customersRes, oppsRes, activitiesRes] = await Promise.all([
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import axios from 'axios';
 import { API } from '../App';
+import { useServerEvents, applyDocumentEvent } from '../hooks/use-server-events';
 import { Card } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { Badge } from '../components/ui/badge';
@@ -25,6 +26,10 @@ export default function TaskList() {
     loadData();
   }, []);
 
+  useServerEvents({
+    task: (event) => setTasks((prev) => applyDocumentEvent(prev, event, 'task'))
+  }, () => loadData());
+
   useEffect(() => {
     filterTasks();
   }, [tasks, filters]);
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# The backend is a flat set of modules, not a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["bulk_upload_test"]
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "BULK_UPLOAD_CHUNK_SIZE", 2)
+    server.user_directory.invalidate()
+    return database
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+
+    async def invalidate_rollups():
+        calls.append(True)
+    monkeypatch.setattr(server, "invalidate_rollups", invalidate_rollups)
+    return calls
+
+
+def upload(body: bytes) -> server.BulkUploadResult:
+    return asyncio.run(server.import_customer_rows(server.read_csv_rows(io.BytesIO(body))))
+
+
+def test_bad_encoding_mid_file_reports_partial_result(db, invalidations):
+    body = b'company_name,region\nAcme,APAC\n"Multi\nLine Co",EMEA\nBeta,US\nGamma,US\nBad\xff Co,US\nLater,US\n'
+    result = upload(body)
+
+    assert result.success_count == 4
+    assert result.errors == [{"row": 6, "error": "Row is not UTF-8 encoded; it and the rows after it were not imported"}]
+    names = asyncio.run(db.customers.distinct("company_name"))
+    assert sorted(names) == ["Acme", "Beta", "Gamma", "Multi\nLine Co"]
+    assert invalidations == [True]
+
+
+def test_reupload_after_fixing_encoding_only_adds_the_rest(db, invalidations):
+    upload(b'company_name\nAcme\nBad\xff Co\nLater\n')
+    result = upload(b'company_name\nAcme\nBad Co\nLater\n')
+
+    assert result.success_count == 2
+    assert [error['row'] for error in result.errors] == [2]
+
+
+def test_failure_part_way_still_invalidates_rollups(db, invalidations, monkeypatch):
+    insert_customer_chunk = server.insert_customer_chunk
+    chunks = []
+
+    async def failing_insert(chunk, errors):
+        chunks.append(chunk)
+        if len(chunks) > 1:
+            raise RuntimeError("connection lost")
+        return await insert_customer_chunk(chunk, errors)
+    monkeypatch.setattr(server, "insert_customer_chunk", failing_insert)
+
+    with pytest.raises(RuntimeError):
+        upload(b'company_name\nA\nB\nC\nD\n')
+    assert invalidations == [True]
+
+
+def test_clean_file_with_only_errors_leaves_rollups_alone(db, invalidations):
+    result = upload(b'company_name,region\n,APAC\n')
+
+    assert result.success_count == 0
+    assert invalidations == []
@@ -0,0 +1,53 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+import server
+from server import etag_matches
+
+
+def request_with(if_none_match=None):
+    headers = Headers({"if-none-match": if_none_match} if if_none_match is not None else {})
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers.raw})
+
+
+def test_etag_matches():
+    etag = 'W/"abc"'
+    assert not etag_matches(request_with(), etag)
+    assert etag_matches(request_with('W/"abc"'), etag)
+    assert etag_matches(request_with('"abc"'), etag)
+    assert etag_matches(request_with('"other", W/"abc"'), etag)
+    assert etag_matches(request_with(" * "), etag)
+    assert not etag_matches(request_with('"abcd", W/"ab"'), etag)
+    assert not etag_matches(request_with(""), etag)
+
+
+def test_document_etag_is_weak_and_tracks_content():
+    first = server.document_etag([{"id": "1", "name": "a"}])
+    assert first.startswith('W/"')
+    assert first == server.document_etag([{"id": "1", "name": "a"}])
+    assert first != server.document_etag([{"id": "1", "name": "b"}])
+    assert first != server.document_etag([{"id": "1", "name": "a"}], salt=b"schema")
+
+
+def test_gzip_and_identity_share_a_weak_etag():
+    app = FastAPI()
+
+    @app.get("/report")
+    async def report(request: Request):
+        return server.conditional_json({"rows": [{"id": i, "name": "customer"} for i in range(200)]}, request)
+
+    app.add_middleware(server.CompressionMiddleware, minimum_size=100)
+    client = TestClient(app)
+
+    gzipped = client.get("/report", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/report", headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in gzipped.headers["vary"].lower()
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] == identity.headers["etag"]
+    assert gzipped.headers["etag"].startswith('W/"')
+
+    revalidated = client.get("/report", headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == identity.headers["etag"]
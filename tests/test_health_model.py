@@ -0,0 +1,66 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from health_model import DEFAULT_HEALTH_MODEL, CompiledHealthModel, HealthModelConfig
+
+FIELDS = ["id", "arr", "active_users", "total_licensed_users", "calls_processed", "last_activity_date",
+          "onboarding_status", "health_score", "health_status", "health_model_version"]
+NOW = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+MISSING = object()
+
+
+def sample_value(rng, choices):
+    value = rng.choice(choices)
+    return value(rng) if callable(value) else value
+
+
+def sample_customer(rng, idx):
+    activity_choices = [
+        None, MISSING, "", "not a date", "2025-05-20",
+        lambda r: (NOW - timedelta(days=r.randint(0, 60))).isoformat(),
+        lambda r: (NOW - timedelta(days=r.randint(0, 60))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        lambda r: (NOW - timedelta(days=r.randint(0, 60))).replace(tzinfo=None).isoformat(),
+        lambda r: NOW - timedelta(days=r.randint(0, 60)),
+    ]
+    fields = {
+        "active_users": [None, MISSING, 0, "12", "abc", float("nan"), lambda r: r.randint(0, 120)],
+        "total_licensed_users": [None, MISSING, 0, "100", lambda r: r.randint(1, 120)],
+        "calls_processed": [None, MISSING, "750", lambda r: r.randint(0, 3000)],
+        "last_activity_date": activity_choices,
+        "onboarding_status": [None, MISSING, "Not Started", "In Progress", "Completed", "Unknown"],
+    }
+    customer = {"id": f"customer_{idx}"}
+    for field, choices in fields.items():
+        value = sample_value(rng, choices)
+        if value is not MISSING:
+            customer[field] = value
+    return customer
+
+
+@pytest.mark.parametrize("config", [
+    DEFAULT_HEALTH_MODEL,
+    HealthModelConfig(version=2, base_score=40, usage_tiers=[(0.2, 30)], calls_tiers=[(0, 5)],
+                      engagement_tiers=[(3, 20), (60, 1)], onboarding_points={"Not Started": -10}),
+])
+def test_score_frame_matches_score(config):
+    model = CompiledHealthModel(config)
+    rng = random.Random(8)
+    customers = [sample_customer(rng, idx) for idx in range(2000)]
+
+    expected = np.array([model.score(customer, NOW) for customer in customers], dtype=float)
+    frame = pd.DataFrame.from_records(customers, columns=FIELDS)
+    actual = model.score_frame(frame, NOW)
+
+    mismatched = np.flatnonzero(expected != actual)
+    assert not len(mismatched), [(customers[i], expected[i], actual[i]) for i in mismatched[:5]]
+    assert list(model.status_array(actual)) == [model.status(score) for score in expected]
+
+
+def test_missing_inputs_score_as_zero():
+    model = CompiledHealthModel(DEFAULT_HEALTH_MODEL)
+    assert model.score({"active_users": None, "total_licensed_users": 10}, NOW) == DEFAULT_HEALTH_MODEL.base_score
+    assert model.score({}, NOW) == DEFAULT_HEALTH_MODEL.base_score
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+from health_model import CompiledHealthModel, HealthModelConfig
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+MODEL = CompiledHealthModel(HealthModelConfig(version=2))
+
+
+def customer(customer_id):
+    return {
+        "id": customer_id, "company_name": customer_id, "arr": 1000.0, "account_status": "Active",
+        "active_users": 80, "total_licensed_users": 100, "calls_processed": 2000,
+        "last_activity_date": None, "onboarding_status": "Completed",
+        "health_score": 10.0, "health_status": "Critical", "health_model_version": 1,
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["recompute_test"]
+    monkeypatch.setattr(server, "db", database)
+    return database
+
+
+def test_rescore_batch_skips_customers_changed_since_the_read(db):
+    async def run():
+        await db.customers.insert_many([customer("plain"), customer("overridden"), customer("edited")])
+        batch = await db.customers.find({}, {"_id": 0, **{field: 1 for field in server.HEALTH_INPUT_FIELDS}}).to_list(None)
+
+        # Writes that land after the batch was read
+        await db.customers.update_one({"id": "overridden"}, {"$set": {"health_override": True, "health_score": 42.0}})
+        await db.customers.update_one({"id": "edited"}, {"$set": {"health_score": 55.0, "health_model_version": 2}})
+
+        assert await server.rescore_batch(batch, MODEL, NOW) == 1
+        scores = {doc['id']: doc['health_score'] async for doc in db.customers.find({})}
+        assert scores == {"plain": MODEL.score(customer("plain"), NOW), "overridden": 42.0, "edited": 55.0}
+        history = await db.customer_metrics_history.find({}).to_list(None)
+        assert [point['customer_id'] for point in history] == ["plain"]
+    asyncio.run(run())
+
+
+def test_leased_job_runs_on_one_worker_per_interval(db, monkeypatch):
+    runs = []
+
+    async def job():
+        runs.append(server.WORKER_ID)
+
+    async def run():
+        for worker in ["worker_a", "worker_b", "worker_a", "worker_b"]:
+            monkeypatch.setattr(server, "WORKER_ID", worker)
+            await server.leased_job("nightly", 3600, job)()
+    asyncio.run(run())
+
+    assert runs == ["worker_a", "worker_a"]
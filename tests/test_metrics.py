@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import server
+from server import CommandProfiler, Metrics, ProfilingMiddleware, RequestProfile, request_profile
+
+
+def command_events(request_id, name, collection, micros=1000):
+    command = {name: collection}
+    return (SimpleNamespace(request_id=request_id, command_name=name, command=command),
+            SimpleNamespace(request_id=request_id, duration_micros=micros))
+
+
+def test_prometheus_text_format():
+    metrics = Metrics()
+    metrics.inc("requests_total", method="GET")
+    metrics.inc("requests_total", 2, method="GET")
+    metrics.inc("requests_total", method="POST")
+    metrics.set("cache_entries", 7)
+    metrics.histogram("latency_seconds", 0.2, (0.1, 0.5), route="/a")
+    metrics.histogram("latency_seconds", 0.5, (0.1, 0.5), route="/a")
+    metrics.histogram("latency_seconds", 3.0, (0.1, 0.5), route="/a")
+
+    assert metrics.prometheus().splitlines() == [
+        "# TYPE requests_total counter",
+        'requests_total{method="GET"} 3',
+        'requests_total{method="POST"} 1',
+        "# TYPE cache_entries gauge",
+        "cache_entries 7",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 0',
+        'latency_seconds_bucket{route="/a",le="0.5"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_count{route="/a"} 3',
+        'latency_seconds_sum{route="/a"} 3.7',
+    ]
+
+
+def test_prometheus_escapes_label_values():
+    metrics = Metrics()
+    metrics.inc("errors_total", reason='bad "quote"\\\nline')
+    assert 'errors_total{reason="bad \\"quote\\"\\\\\\nline"} 1' in metrics.prometheus()
+
+
+def test_command_profiler_attributes_commands_to_the_current_request():
+    profiler = CommandProfiler()
+    profile = RequestProfile()
+    token = request_profile.set(profile)
+    try:
+        for request_id in range(3):
+            started, finished = command_events(request_id, "find", "customers")
+            profiler.started(started)
+            profiler.succeeded(finished)
+        started, finished = command_events(99, "aggregate", "tasks", micros=5000)
+        profiler.started(started)
+        profiler.failed(finished)
+    finally:
+        request_profile.reset(token)
+
+    assert profile.commands == {("find", "customers"): [3, 0.003], ("aggregate", "tasks"): [1, 0.005]}
+    assert profile.pending == {}
+
+
+def test_command_profiler_ignores_unsampled_requests():
+    profiler = CommandProfiler()
+    started, finished = command_events(1, "find", "customers")
+    profiler.started(started)
+    profiler.succeeded(finished)
+    assert request_profile.get() is None
+
+
+def test_profiling_middleware_records_latency_and_flags_n_plus_one(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(server, "metrics", metrics)
+    monkeypatch.setattr(server, "PROFILE_SAMPLE_RATE", 1.0)
+    profiler = CommandProfiler()
+
+    async def app(scope, receive, send):
+        scope['route'] = SimpleNamespace(path="/api/customers/{customer_id}")
+        for request_id in range(server.N_PLUS_ONE_THRESHOLD):
+            started, finished = command_events(request_id, "find", "users")
+            profiler.started(started)
+            profiler.succeeded(finished)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/customers/c1", "headers": []}
+    asyncio.run(ProfilingMiddleware(app)(scope, receive, send))
+
+    route = "/api/customers/{customer_id}"
+    labels = {"method": "GET", "route": route, "command": "find", "collection": "users"}
+    assert metrics.counters[Metrics.key("mongo_commands_total", labels)] == server.N_PLUS_ONE_THRESHOLD
+    assert metrics.counters[Metrics.key("mongo_n_plus_one_total", labels)] == 1
+    latency = metrics.histograms[Metrics.key("http_request_duration_seconds", {"method": "GET", "route": route, "status": "200"})]
+    assert latency['count'] == 1
+    assert request_profile.get() is None
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+def invoice(invoice_id, days_past_due, status="Raised"):
+    return {
+        "id": invoice_id,
+        "customer_id": "customer_1",
+        "invoice_number": f"INV-{invoice_id}",
+        "invoice_amount": 1000.0,
+        "paid_amount": 0.0,
+        "due_date": (TODAY - timedelta(days=days_past_due)).isoformat(),
+        "status": status,
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["sweep_test"]
+    monkeypatch.setattr(server, "db", database)
+    server.user_directory.invalidate()
+
+    async def setup():
+        await database.risks.create_index("id", unique=True)
+        await database.customers.insert_one({"id": "customer_1", "company_name": "Acme", "csm_owner_id": None})
+    asyncio.run(setup())
+    return database
+
+
+def test_sweep_resumes_after_crash_before_risks(db):
+    async def run():
+        await db.invoices.insert_many([invoice("a", 3), invoice("b", 5)])
+        # A sweep that died right after marking the invoices Overdue
+        assert await server.mark_overdue_invoices(TODAY.isoformat()) == 2
+
+        result = await server.sweep_overdue_invoices()
+        assert result == {"marked_overdue": 0, "risks_raised": 2}
+        assert await db.risks.count_documents({}) == 2
+        assert await db.invoices.count_documents({"overdue_risk_id": None}) == 0
+    asyncio.run(run())
+
+
+def test_sweep_resumes_after_crash_before_linking_risks(db):
+    async def run():
+        await db.invoices.insert_one(invoice("a", 3))
+        await server.sweep_overdue_invoices()
+        # A sweep that died after inserting the risk but before recording it on the invoice
+        await db.invoices.update_one({"id": "a"}, {"$unset": {"overdue_risk_id": ""}})
+
+        result = await server.sweep_overdue_invoices()
+        assert result["risks_raised"] == 0
+        assert await db.risks.count_documents({}) == 1
+        stored = await db.invoices.find_one({"id": "a"})
+        assert stored['overdue_risk_id'] == server.overdue_risk_id("a")
+    asyncio.run(run())
+
+
+def test_sweep_skips_risks_for_invoices_past_the_cutoff(db):
+    async def run():
+        await db.invoices.insert_many([
+            invoice("recent", 2),
+            invoice("historical", server.INVOICE_RISK_MAX_AGE_DAYS + 10),
+            invoice("paid", 2, status="Paid"),
+        ])
+        result = await server.sweep_overdue_invoices()
+        assert result == {"marked_overdue": 2, "risks_raised": 1}
+        assert (await db.invoices.find_one({"id": "historical"}))['status'] == "Overdue"
+        assert [risk['title'] async for risk in db.risks.find({})] == ["Overdue Invoice: INV-recent"]
+    asyncio.run(run())
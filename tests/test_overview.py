@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException, Request
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+USER = {"user_id": "user_1", "email": "csm@example.com", "role": "CSM"}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock_motor.AsyncMongoMockClient()["overview_test"]
+    monkeypatch.setattr(server, "db", database)
+    server.user_directory.invalidate()
+
+    async def setup():
+        await database.users.insert_one({"id": "user_1", "name": "Casey", "email": "csm@example.com", "role": "CSM"})
+        await database.customers.insert_one({"id": "c1", "company_name": "Acme", "arr": 1000.0})
+    asyncio.run(setup())
+    return database
+
+
+def overview(fields=None):
+    request = Request({"type": "http", "method": "GET", "path": "/api/customers/c1/overview", "headers": []})
+    response = asyncio.run(server.get_customer_overview(
+        "c1", request, sections=None, limit=50, limits=None, fields=fields, current_user=USER
+    ))
+    return json.loads(response.body)
+
+
+def test_overview_returns_minimal_document_and_churn_record(db):
+    async def record():
+        await server.add_document("c1", {"document_url": "http://x"}, current_user=USER)
+        await server.record_customer_churn("c1", server.ChurnRequest(account_status="Churn", churn_data={}), current_user=USER)
+    asyncio.run(record())
+
+    result = overview()
+    assert result['customer']['company_name'] == "Acme"
+    [document] = result['documents']
+    assert document['document_url'] == "http://x"
+    assert document['title'] is None
+    assert result['churn_record']['churn_type'] is None
+    assert result['churn_record']['customer_name'] == "Acme"
+
+    masked = overview(fields="documents.document_url,churn_record.primary_reason")
+    assert set(masked['documents'][0]) == {"id", "document_url"}
+    assert set(masked['churn_record']) == {"id", "primary_reason"}
+
+
+def test_overview_rejects_unknown_fields_on_raw_sections(db):
+    with pytest.raises(HTTPException) as error:
+        overview(fields="documents.not_a_field")
+    assert error.value.status_code == 400
@@ -0,0 +1,36 @@
+import pytest
+from fastapi import HTTPException
+
+from server import decode_cursor, encode_cursor, keyset_filter
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def test_cursor_round_trip():
+    for value in ["Acme", 1250000.5, None, "2025-01-31"]:
+        assert decode_cursor(encode_cursor(value, "customer_7")) == (value, "customer_7")
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_keyset_pages_cover_every_document_once(direction):
+    collection = mongomock.MongoClient().db.customers
+    values = [None, 10, 20, 20, None, 30, 10, 20]
+    collection.insert_many([{"id": f"c{idx}", "arr": value} for idx, value in enumerate(values)])
+    order = [("arr", direction), ("id", direction)]
+    expected = [doc['id'] for doc in collection.find({}).sort(order)]
+
+    seen, query = [], {}
+    while True:
+        page = list(collection.find(query).sort(order).limit(3))
+        if not page:
+            break
+        seen += [doc['id'] for doc in page]
+        query = keyset_filter("arr", direction, page[-1]['arr'], page[-1]['id'])
+
+    assert seen == expected
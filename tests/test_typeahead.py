@@ -0,0 +1,95 @@
+import asyncio
+import random
+
+import pytest
+
+import server
+from server import PrefixIndex
+
+
+def entry(entry_id, name):
+    return entry_id, name, {"id": entry_id, "company_name": name}
+
+
+def names(results):
+    return sorted(result["company_name"] for result in results)
+
+
+def test_search_matches_whole_name_and_later_words():
+    index = PrefixIndex()
+    index.load([entry("1", "HDFC Bank"), entry("2", "Axis  bank"), entry("3", "Banyan Tree")])
+
+    assert names(index.search("hd", 10)) == ["HDFC Bank"]
+    assert names(index.search("BANK", 10)) == ["Axis  bank", "HDFC Bank"]
+    assert names(index.search("ban", 10)) == ["Axis  bank", "Banyan Tree", "HDFC Bank"]
+    assert names(index.search("axis b", 10)) == ["Axis  bank"]
+    assert len(index.search("ban", 2)) == 2
+
+
+def test_put_many_matches_repeated_put():
+    rng = random.Random(7)
+    words = ["acme", "bank", "global", "tech", "health", "retail", "a"]
+    batch = [entry(str(i), " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))) for i in range(300)]
+    # Overwrites of earlier ids, both within the batch and of entries already indexed
+    batch += [entry(str(i), "renamed " + words[i % len(words)]) for i in range(0, 300, 7)]
+
+    one_by_one, batched = PrefixIndex(), PrefixIndex()
+    one_by_one.load(batch[:50])
+    batched.load(batch[:50])
+    for item in batch[50:]:
+        one_by_one.put(*item)
+    batched.put_many(batch[50:])
+
+    assert batched.keys == one_by_one.keys
+    assert batched.entries == one_by_one.entries
+    assert batched.keys == sorted(batched.keys)
+
+
+def test_remove_drops_all_keys():
+    index = PrefixIndex()
+    index.put_many([entry("1", "HDFC Bank"), entry("2", "Axis Bank")])
+    index.remove("1")
+
+    assert names(index.search("bank", 10)) == ["Axis Bank"]
+    assert all(entry_id != "1" for _, entry_id in index.keys)
+
+
+def test_writes_during_reload_survive_the_swap():
+    index = PrefixIndex()
+    index.load([entry("1", "Old Name"), entry("2", "Deleted Co")])
+
+    index.begin_load()
+    snapshot = [entry("1", "Old Name"), entry("2", "Deleted Co")]  # Read before the writes below
+    index.put(*entry("1", "New Name"))
+    index.put(*entry("3", "Created Co"))
+    index.remove("2")
+    index.load(snapshot)
+    index.end_load()
+
+    assert names(index.search("", 10)) == ["Created Co", "New Name"]
+    assert index.search("old", 10) == []
+    assert index.pending is None
+
+    # Once the reload is over, later loads replace the index outright
+    index.load([entry("4", "Fresh")])
+    assert names(index.search("", 10)) == ["Fresh"]
+
+
+def test_load_typeahead_keeps_concurrent_put(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["typeahead_test"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "typeahead_indexes", {kind: PrefixIndex(extra_keys=index.extra_keys)
+                                                       for kind, index in server.typeahead_indexes.items()})
+
+    async def scenario():
+        await db.customers.insert_one({"id": "1", "company_name": "Stored Co"})
+        reload = asyncio.create_task(server.load_typeahead())
+        await asyncio.sleep(0)  # Let the reload start reading
+        server.typeahead_put("customers", {"id": "2", "company_name": "Created Co"})
+        await reload
+
+    asyncio.run(scenario())
+
+    assert names(server.typeahead_indexes["customers"].search("co", 10)) == ["Created Co", "Stored Co"]
+    assert server.typeahead_indexes["customers"].pending is None